@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Benchmark reproducible de las operaciones principales del Sistema de Biblioteca.
+
+Uso:
+    python Benchmark_Biblioteca.py                          # escalas 10^3 a 10^5
+    python Benchmark_Biblioteca.py --escalas 1000,1000000   # hasta 10^6
+    python Benchmark_Biblioteca.py --salida base.json
+    python Benchmark_Biblioteca.py --comparar base.json     # sale con código 1 si hay regresiones
+    python Benchmark_Biblioteca.py --reservas               # reintentos vs. cola de reservas
+
+Estudiante: [Santiago Rico Cardona]
+Fecha: [21/10/25]
+"""
+
+from collections import deque
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from Sistema_Biblioteca import ErrorBiblioteca, Prestamo, SistemaBiblioteca
+
+
+PALABRAS = ['amor', 'guerra', 'paz', 'sol', 'luna', 'mar', 'tiempo', 'noche', 'ciudad', 'río',
+            'sombra', 'viento', 'historia', 'casa', 'camino', 'fuego', 'silencio', 'memoria',
+            'jardín', 'invierno', 'verano', 'montaña', 'isla', 'reino', 'sueño', 'voz']
+APELLIDOS = ['García', 'Márquez', 'Borges', 'Cortázar', 'Allende', 'Neruda', 'Mistral', 'Paz',
+             'Fuentes', 'Rulfo', 'Vargas', 'Llosa', 'Onetti', 'Sábato', 'Benedetti', 'Storni']
+CATEGORIAS = ['Ficción', 'Historia', 'Ciencia', 'Poesía', 'Ensayo', 'Infantil', 'Fantasía', 'Clásico']
+
+
+# ===========================================================================
+# DATOS SINTÉTICOS
+# ===========================================================================
+
+def generar_biblioteca(escala, semilla=42, tamano_cache=0):
+    """
+    Crea un sistema con `escala` libros, escala/10 usuarios y `escala`
+    préstamos históricos repartidos en los últimos ~4 años (la mayoría
+    devueltos, algunos con multa y parte de ellas pagadas).
+
+    Con la misma escala y semilla los datos son siempre los mismos. La
+    caché de reportes está desactivada por defecto: las llamadas repetidas
+    de medir_escala deben medir el cálculo, no aciertos de caché.
+    """
+    azar = random.Random(semilla)
+    biblioteca = SistemaBiblioteca(dias_prestamo=14, multa_por_dia=0.5, limite_prestamos=5,
+                                   tamano_cache=tamano_cache)
+
+    isbns = [f"{9780000000000 + i}" for i in range(escala)]
+    for i, isbn in enumerate(isbns):
+        titulo = ' '.join(azar.choice(PALABRAS) for _ in range(azar.randint(1, 4))).capitalize()
+        autor = f"{azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}"
+        biblioteca._insertar_libro(isbn, titulo, autor, 1900 + azar.randrange(125),
+                                   azar.choice(CATEGORIAS), azar.randint(1, 5), diferir_texto=True)
+
+    usuarios = [f"U{u:07d}" for u in range(max(100, escala // 10))]
+    for id_usuario in usuarios:
+        biblioteca._registrar_usuario(id_usuario, f"Usuario {id_usuario}", f"{id_usuario.lower()}@correo.com",
+                                      "2024-01-01")
+
+    hoy = date.today()
+    for _ in range(escala):
+        isbn = azar.choice(isbns)
+        libro = biblioteca.catalogo[isbn]
+        id_usuario = azar.choice(usuarios)
+        devuelto = azar.random() < 0.97
+        # Un préstamo devuelto en el acto repone su copia, así que los
+        # históricos no agotan el catálogo; solo los activos la consumen.
+        if not devuelto and (libro.copias_disponibles < 1 or
+                             len(biblioteca.usuarios[id_usuario].prestamos_activos) >= 2):
+            devuelto = True
+
+        fecha_prestamo = hoy - timedelta(days=azar.randint(20, 1500))
+        id_prestamo = biblioteca._get_next_prestamo_id()
+        biblioteca._registrar_prestamo(id_prestamo, isbn, id_usuario, fecha_prestamo,
+                                       fecha_prestamo + timedelta(days=14))
+        if devuelto:
+            biblioteca._registrar_devolucion(id_prestamo, fecha_prestamo + timedelta(days=azar.randint(1, 30)))
+            if biblioteca.prestamos[id_prestamo].multa > 0 and azar.random() < 0.5:
+                biblioteca._registrar_pago(id_prestamo)
+
+    assert all(0 <= libro.copias_disponibles <= libro.copias_total for libro in biblioteca.catalogo.values()), \
+        "Copias disponibles fuera de rango en los datos generados"
+    return biblioteca, isbns, usuarios
+
+
+# ===========================================================================
+# MEDICIONES
+# ===========================================================================
+
+def _por_llamada(funcion, argumentos, rondas=1):
+    """
+    Cronometra funcion(*args) para cada tupla de argumentos.
+
+    Con rondas > 1 (solo para operaciones que no modifican el sistema) la
+    lista se repite y se conserva la ronda de menor mediana, que es la
+    menos afectada por el ruido de la máquina.
+    """
+    mejor = None
+    for _ in range(rondas):
+        tiempos = []
+        for args in argumentos:
+            inicio = time.perf_counter()
+            funcion(*args)
+            tiempos.append(time.perf_counter() - inicio)
+        resumen = _resumen(tiempos)
+        if mejor is None or resumen['mediana_ms'] < mejor['mediana_ms']:
+            mejor = resumen
+    return mejor
+
+
+def _resumen(tiempos):
+    ordenados = sorted(tiempos)
+    total = sum(tiempos)
+    return {
+        'llamadas': len(tiempos),
+        'mediana_ms': round(statistics.median(ordenados) * 1000, 4),
+        'p95_ms': round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))] * 1000, 4),
+        'ops_por_segundo': round(len(tiempos) / total, 1) if total > 0 else None
+    }
+
+
+def medir_memoria_prestamos(cantidad, semilla=42):
+    """
+    Bytes por préstamo (tracemalloc) guardándolo como dict de 7 claves,
+    como antes de los registros, y como Prestamo.
+
+    ISBN, usuarios, fechas y montos se crean antes de medir y se comparten
+    entre los préstamos, igual que en el sistema: solo cuenta el registro.
+    """
+    azar = random.Random(semilla)
+    isbns = [f"{9780000000000 + i}" for i in range(1000)]
+    usuarios = [f"U{u:07d}" for u in range(1000)]
+    hoy = date.today()
+    fechas = [hoy - timedelta(days=d) for d in range(1500)]
+    multas = [0.0, 0.5, 1.5, 7.0]
+    campos = [(azar.choice(isbns), azar.choice(usuarios), azar.choice(fechas), azar.choice(fechas),
+               azar.choice(fechas), azar.choice(multas), azar.random() < 0.5) for _ in range(cantidad)]
+
+    def como_dict(isbn, id_usuario, prestamo, vencimiento, devolucion, multa, pagada):
+        return {'isbn': isbn, 'id_usuario': id_usuario, 'fecha_prestamo': prestamo,
+                'fecha_vencimiento': vencimiento, 'fecha_devolucion': devolucion,
+                'multa': multa, 'pagada': pagada}
+
+    resultado = {'prestamos': cantidad}
+    for nombre, crear in (('dict', como_dict), ('Prestamo', Prestamo)):
+        registros = [None] * cantidad
+        tracemalloc.start()
+        try:
+            antes = tracemalloc.get_traced_memory()[0]
+            for i, valores in enumerate(campos):
+                registros[i] = crear(*valores)
+            resultado[f'bytes_por_prestamo_{nombre}'] = round((tracemalloc.get_traced_memory()[0] - antes) / cantidad, 1)
+        finally:
+            tracemalloc.stop()
+        del registros
+    return resultado
+
+
+def medir_escala(escala, semilla=42, llamadas=200, rondas=3):
+    """Ejecuta todas las mediciones para una escala; retorna {operacion: resumen}."""
+    resultados = {}
+    azar = random.Random(semilla + 1)
+
+    inicio = time.perf_counter()
+    biblioteca, isbns, usuarios = generar_biblioteca(escala, semilla)
+    resultados['generar_datos'] = {'segundos': round(time.perf_counter() - inicio, 3)}
+
+    # La primera búsqueda de texto construye el índice diferido: se mide aparte.
+    inicio = time.perf_counter()
+    biblioteca.buscar_libros('titulo', 'zzz')
+    resultados['indexar_texto'] = {'segundos': round(time.perf_counter() - inicio, 3)}
+
+    consultas = [(azar.choice(['titulo', 'autor']), azar.choice(PALABRAS + APELLIDOS)[:azar.randint(3, 6)].lower())
+                 for _ in range(llamadas)]
+    resultados['buscar_libros'] = _por_llamada(biblioteca.buscar_libros, consultas, rondas)
+    resultados['buscar_libros_corta'] = _por_llamada(
+        biblioteca.buscar_libros, [('titulo', azar.choice('aeiou')) for _ in range(min(llamadas, 20))], rondas)
+    resultados['buscar_libros_anio'] = _por_llamada(
+        biblioteca.buscar_libros, [('anio', str(1900 + azar.randrange(125))) for _ in range(llamadas)], rondas)
+    resultados['obtener_estado_usuario'] = _por_llamada(
+        biblioteca.obtener_estado_usuario, [(azar.choice(usuarios),) for _ in range(llamadas)], rondas)
+
+    # Préstamos y devoluciones con usuarios nuevos, sin historial ni multas
+    nuevos = [f"B{i:07d}" for i in range(llamadas)]
+    for id_usuario in nuevos:
+        biblioteca.registrar_usuario(id_usuario, "Usuario de prueba", "prueba@correo.com")
+    disponibles = [isbn for isbn in azar.sample(isbns, min(len(isbns), llamadas * 3))
+                   if biblioteca.catalogo[isbn].copias_disponibles > 0][:llamadas]
+    solicitudes = list(zip(disponibles, nuevos))
+    ids = []
+    tiempos = []
+    for isbn, id_usuario in solicitudes:
+        inicio = time.perf_counter()
+        ids.append(biblioteca.prestar_libro(isbn, id_usuario))
+        tiempos.append(time.perf_counter() - inicio)
+    resultados['prestar_libro'] = _resumen(tiempos)
+    resultados['devolver_libro'] = _por_llamada(biblioteca.devolver_libro, [(i,) for i in ids])
+
+    repeticiones = max(5, min(50, llamadas // 10))
+    resultados['libros_mas_prestados'] = _por_llamada(biblioteca.libros_mas_prestados, [(10,)] * repeticiones, rondas)
+    resultados['usuarios_mas_activos'] = _por_llamada(biblioteca.usuarios_mas_activos, [(5,)] * repeticiones, rondas)
+    resultados['estadisticas_categoria'] = _por_llamada(
+        biblioteca.estadisticas_categoria, [(azar.choice(CATEGORIAS),) for _ in range(repeticiones)], rondas)
+    resultados['prestamos_vencidos'] = _por_llamada(biblioteca.prestamos_vencidos, [()] * repeticiones, rondas)
+    resultados['reporte_financiero'] = _por_llamada(biblioteca.reporte_financiero, [()] * repeticiones, rondas)
+    hoy = date.today()
+    resultados['reporte_financiero_mes'] = _por_llamada(
+        biblioteca.reporte_financiero,
+        [(hoy - timedelta(days=d + 30), hoy - timedelta(days=d)) for d in range(0, 30 * repeticiones, 30)], rondas)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, 'catalogo.txt')
+        with redirect_stdout(io.StringIO()):
+            resultados['exportar_catalogo'] = _por_llamada(biblioteca.exportar_catalogo, [(archivo,)], rondas)
+            resultados['exportar_catalogo_gzip'] = _por_llamada(
+                biblioteca.exportar_catalogo, [(archivo + '.gz',)], rondas)
+        resultados['importar_catalogo'] = _por_llamada(SistemaBiblioteca().importar_catalogo, [(archivo,)])
+        resultados['importar_catalogo']['libros_por_segundo'] = round(escala / (resultados['importar_catalogo']['mediana_ms'] / 1000), 1)
+
+    resultados['memoria_prestamo'] = medir_memoria_prestamos(escala, semilla)
+    return resultados
+
+
+# ===========================================================================
+# SIMULACIÓN: REINTENTOS VS. COLA DE RESERVAS
+# ===========================================================================
+
+def simular_reservas(reservas, num_libros=200, num_usuarios=5000, pasos=300, semilla=42):
+    """
+    Simula usuarios que piden libros populares con pocas copias.
+
+    En cada paso llegan solicitudes nuevas y cada préstamo activo se
+    devuelve con probabilidad fija. Sin reservas, cada solicitud pendiente
+    reintenta prestar_libro en todos los pasos hasta conseguir el libro;
+    con reservas, un intento fallido deja una reserva y el usuario solo
+    vuelve a llamar al recibir el aviso de que tiene una copia asignada.
+
+    Retorna el total de llamadas, los intentos fallidos y el tiempo de
+    devolver_libro (que con reservas además asigna la copia devuelta).
+    """
+    azar = random.Random(semilla)
+    biblioteca = SistemaBiblioteca(limite_prestamos=10)
+    isbns = [f"{9780000000000 + i}" for i in range(num_libros)]
+    for isbn in isbns:
+        biblioteca.agregar_libro(isbn, f"Libro {isbn[-4:]}", "Autor", 2000, "Ficción", azar.randint(1, 3))
+    usuarios = [f"U{u:07d}" for u in range(num_usuarios)]
+    for id_usuario in usuarios:
+        biblioteca.registrar_usuario(id_usuario, f"Usuario {id_usuario}", f"{id_usuario.lower()}@correo.com")
+
+    avisos = deque()
+    biblioteca.suscribir_notificaciones(avisos.append)
+
+    pendientes = set()
+    activos = []
+    llamadas = {'prestar_libro': 0, 'reservar_libro': 0}
+    fallidos = 0
+    tiempos_devolucion = []
+
+    def prestar(isbn, id_usuario):
+        nonlocal fallidos
+        llamadas['prestar_libro'] += 1
+        try:
+            activos.append(biblioteca.prestar_libro(isbn, id_usuario))
+            return True
+        except ErrorBiblioteca:
+            fallidos += 1
+            return False
+
+    for _ in range(pasos):
+        # Demanda sesgada: la mitad de las solicitudes van al 10% de los libros
+        for _ in range(20):
+            populares = azar.random() < 0.5
+            isbn = azar.choice(isbns[:num_libros // 10] if populares else isbns)
+            solicitud = (isbn, azar.choice(usuarios))
+            if solicitud in pendientes:
+                continue
+            if not prestar(*solicitud):
+                pendientes.add(solicitud)
+                if reservas:
+                    llamadas['reservar_libro'] += 1
+                    try:
+                        biblioteca.reservar_libro(*solicitud)
+                    except (ErrorBiblioteca, ValueError):
+                        pendientes.discard(solicitud)
+
+        azar.shuffle(activos)
+        conservados = []
+        for id_prestamo in activos:
+            if azar.random() < 0.1:
+                inicio = time.perf_counter()
+                biblioteca.devolver_libro(id_prestamo)
+                tiempos_devolucion.append(time.perf_counter() - inicio)
+            else:
+                conservados.append(id_prestamo)
+        activos[:] = conservados
+
+        if reservas:
+            while avisos:
+                evento = avisos.popleft()
+                if evento['tipo'] == 'reserva_asignada':
+                    solicitud = (evento['isbn'], evento['id_usuario'])
+                    pendientes.discard(solicitud)
+                    prestar(*solicitud)
+        else:
+            for solicitud in list(pendientes):
+                if prestar(*solicitud):
+                    pendientes.discard(solicitud)
+
+    return {
+        'llamadas': llamadas,
+        'intentos_fallidos': fallidos,
+        'prestamos': len(biblioteca.prestamos),
+        'en_espera_al_final': len(pendientes),
+        'devolver_libro': _resumen(tiempos_devolucion)
+    }
+
+
+# ===========================================================================
+# COMPARACIÓN CON UNA EJECUCIÓN ANTERIOR
+# ===========================================================================
+
+def comparar(actual, base, tolerancia):
+    """
+    Retorna [(escala, operacion, base_ms, actual_ms)] de las mediciones cuya
+    mediana empeoró más que `tolerancia` (0.25 = 25%) respecto de `base`.
+    """
+    regresiones = []
+    for escala, operaciones in actual['resultados'].items():
+        anteriores = base.get('resultados', {}).get(escala, {})
+        for operacion, medida in operaciones.items():
+            anterior = anteriores.get(operacion, {})
+            clave = 'mediana_ms' if 'mediana_ms' in medida else 'segundos'
+            if clave in anterior and anterior[clave] > 0 and medida[clave] > anterior[clave] * (1 + tolerancia):
+                regresiones.append((escala, operacion, anterior[clave], medida[clave]))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del Sistema de Biblioteca")
+    parser.add_argument('--escalas', default='1000,10000,100000',
+                        help="Escalas separadas por comas (libros y préstamos históricos)")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--llamadas', type=int, default=200, help="Llamadas por operación medida")
+    parser.add_argument('--rondas', type=int, default=3,
+                        help="Repeticiones de las operaciones de solo lectura (se toma la mejor)")
+    parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados")
+    parser.add_argument('--comparar', help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument('--tolerancia', type=float, default=0.25)
+    parser.add_argument('--reservas', action='store_true',
+                        help="Solo simula la demanda con reintentos y con cola de reservas")
+    args = parser.parse_args(argv)
+
+    if args.reservas:
+        resultado = {'reintentos': simular_reservas(False, semilla=args.semilla),
+                     'reservas': simular_reservas(True, semilla=args.semilla)}
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+        return 0
+
+    reporte = {
+        'version': 1,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'semilla': args.semilla,
+        'llamadas': args.llamadas,
+        'rondas': args.rondas,
+        'resultados': {}
+    }
+    for escala in (int(e) for e in args.escalas.split(',')):
+        print(f"Escala {escala:,}...", file=sys.stderr)
+        reporte['resultados'][str(escala)] = medir_escala(escala, args.semilla, args.llamadas, args.rondas)
+
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            regresiones = comparar(reporte, json.load(f), args.tolerancia)
+        for escala, operacion, antes, ahora in regresiones:
+            print(f"REGRESIÓN escala={escala} {operacion}: {antes} -> {ahora}", file=sys.stderr)
+        return 1 if regresiones else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Fachada asíncrona (asyncio) del Sistema de Biblioteca.
+
+Estudiante: [Santiago Rico Cardona]
+Fecha: [21/10/25]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from Sistema_Biblioteca import SistemaBiblioteca
+
+
+# ===========================================================================
+# FACHADA ASÍNCRONA
+# ===========================================================================
+
+class BibliotecaAsync:
+    """
+    Versión awaitable de los métodos principales de SistemaBiblioteca.
+
+    Cada llamada se ejecuta en un pool de hilos, de modo que la lectura y
+    escritura de archivos (importar/exportar, instantáneas) y los reportes
+    largos no bloquean el bucle de eventos. Varias llamadas pueden estar en
+    curso a la vez (por ejemplo, con asyncio.gather).
+
+    Si el sistema envuelto no es concurrente (concurrente=False) las
+    llamadas se serializan en un único hilo, porque sus estructuras no
+    admiten acceso simultáneo.
+    """
+
+    def __init__(self, biblioteca=None, max_hilos=None, **opciones):
+        """
+        Args:
+            biblioteca: SistemaBiblioteca a envolver; si es None se crea uno
+                        concurrente con las opciones indicadas
+            max_hilos: Tamaño del pool de hilos (None = por defecto)
+        """
+        if biblioteca is None:
+            biblioteca = SistemaBiblioteca(concurrente=True, **opciones)
+        self.biblioteca = biblioteca
+
+        concurrente = biblioteca._cerrojos_usuario is not None
+        self._ejecutor = ThreadPoolExecutor(max_workers=max_hilos if concurrente else 1,
+                                            thread_name_prefix='biblioteca')
+
+    async def _ejecutar(self, metodo, *args, **kwargs):
+        """Ejecuta un método del sistema en el pool y espera su resultado."""
+        bucle = asyncio.get_running_loop()
+        return await bucle.run_in_executor(self._ejecutor, partial(metodo, *args, **kwargs))
+
+    async def cerrar(self):
+        """Espera las llamadas pendientes y libera el pool de hilos."""
+        await asyncio.get_running_loop().run_in_executor(None, self._ejecutor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.cerrar()
+
+    # -----------------------------------------------------------------------
+    # Catálogo y usuarios
+    # -----------------------------------------------------------------------
+
+    async def agregar_libro(self, isbn, titulo, autor, anio, categoria, copias):
+        return await self._ejecutar(self.biblioteca.agregar_libro, isbn, titulo, autor, anio, categoria, copias)
+
+    async def actualizar_copias(self, isbn, cantidad_cambio):
+        return await self._ejecutar(self.biblioteca.actualizar_copias, isbn, cantidad_cambio)
+
+    async def buscar_libros(self, criterio='titulo', valor='', categoria=None):
+        return await self._ejecutar(self.biblioteca.buscar_libros, criterio, valor, categoria)
+
+    async def buscar_por_rango_anios(self, anio_inicio=None, anio_fin=None, categoria=None):
+        return await self._ejecutar(self.biblioteca.buscar_por_rango_anios, anio_inicio, anio_fin, categoria)
+
+    async def registrar_usuario(self, id_usuario, nombre, email):
+        return await self._ejecutar(self.biblioteca.registrar_usuario, id_usuario, nombre, email)
+
+    async def obtener_estado_usuario(self, id_usuario):
+        return await self._ejecutar(self.biblioteca.obtener_estado_usuario, id_usuario)
+
+    # -----------------------------------------------------------------------
+    # Préstamos
+    # -----------------------------------------------------------------------
+
+    async def prestar_libro(self, isbn, id_usuario):
+        return await self._ejecutar(self.biblioteca.prestar_libro, isbn, id_usuario)
+
+    async def devolver_libro(self, id_prestamo):
+        return await self._ejecutar(self.biblioteca.devolver_libro, id_prestamo)
+
+    async def renovar_prestamo(self, id_prestamo):
+        return await self._ejecutar(self.biblioteca.renovar_prestamo, id_prestamo)
+
+    async def pagar_multa(self, id_prestamo):
+        return await self._ejecutar(self.biblioteca.pagar_multa, id_prestamo)
+
+    async def prestar_lote(self, solicitudes):
+        return await self._ejecutar(self.biblioteca.prestar_lote, list(solicitudes))
+
+    async def devolver_lote(self, ids_prestamo):
+        return await self._ejecutar(self.biblioteca.devolver_lote, list(ids_prestamo))
+
+    # -----------------------------------------------------------------------
+    # Reservas
+    # -----------------------------------------------------------------------
+
+    async def reservar_libro(self, isbn, id_usuario):
+        return await self._ejecutar(self.biblioteca.reservar_libro, isbn, id_usuario)
+
+    async def cancelar_reserva(self, id_reserva):
+        return await self._ejecutar(self.biblioteca.cancelar_reserva, id_reserva)
+
+    async def notificaciones(self, id_usuario):
+        return await self._ejecutar(self.biblioteca.notificaciones, id_usuario)
+
+    # -----------------------------------------------------------------------
+    # Reportes
+    # -----------------------------------------------------------------------
+
+    async def libros_mas_prestados(self, n=10):
+        return await self._ejecutar(self.biblioteca.libros_mas_prestados, n)
+
+    async def usuarios_mas_activos(self, n=5):
+        return await self._ejecutar(self.biblioteca.usuarios_mas_activos, n)
+
+    async def estadisticas_categoria(self, categoria):
+        return await self._ejecutar(self.biblioteca.estadisticas_categoria, categoria)
+
+    async def prestamos_vencidos(self):
+        return await self._ejecutar(self.biblioteca.prestamos_vencidos)
+
+    async def reporte_financiero(self, fecha_inicio=None, fecha_fin=None):
+        return await self._ejecutar(self.biblioteca.reporte_financiero, fecha_inicio, fecha_fin)
+
+    # -----------------------------------------------------------------------
+    # Archivos
+    # -----------------------------------------------------------------------
+
+    async def exportar_catalogo(self, archivo='catalogo.txt', **opciones):
+        return await self._ejecutar(self.biblioteca.exportar_catalogo, archivo, **opciones)
+
+    async def importar_catalogo(self, archivo='catalogo.txt', **opciones):
+        return await self._ejecutar(self.biblioteca.importar_catalogo, archivo, **opciones)
+
+    async def guardar_estado(self, archivo='biblioteca.snap'):
+        return await self._ejecutar(self.biblioteca.guardar_estado, archivo)
+
+
+# ===========================================================================
+# BENCHMARK: LATENCIA DEL BUCLE DURANTE UNA IMPORTACIÓN
+# ===========================================================================
+
+async def _medir_latencia(tarea, intervalo=0.001):
+    """
+    Ejecuta `tarea` (una corrutina) mientras un latido duerme `intervalo`
+    en bucle; retorna el resultado de la tarea y los retrasos del latido en ms.
+    """
+    retrasos = []
+    terminado = False
+
+    async def latido():
+        while not terminado:
+            t0 = time.perf_counter()
+            await asyncio.sleep(intervalo)
+            retrasos.append((time.perf_counter() - t0 - intervalo) * 1000)
+
+    pulso = asyncio.create_task(latido())
+    await asyncio.sleep(0)
+    try:
+        resultado = await tarea
+    finally:
+        terminado = True
+        await pulso
+    return resultado, retrasos
+
+
+def _resumen(retrasos):
+    ordenados = sorted(retrasos)
+    p99 = ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.99))]
+    return f"latidos={len(retrasos):5d}  mediana={statistics.median(retrasos):7.2f} ms  p99={p99:8.2f} ms  max={ordenados[-1]:8.2f} ms"
+
+
+async def benchmark(num_libros=200000):
+    """Compara la latencia del bucle importando directo vs. con la fachada."""
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, 'catalogo.txt')
+        with open(archivo, 'w', encoding='utf-8') as f:
+            for i in range(num_libros):
+                f.write(f"{9780000000000 + i}|Título {i}|Autor {i % 500}|{1900 + i % 120}|Categoría {i % 12}|{1 + i % 5}\n")
+
+        print(f"\nImportando {num_libros:,} libros con un latido de 1 ms en el bucle:")
+
+        async def directo():
+            return SistemaBiblioteca().importar_catalogo(archivo)
+
+        resultado, retrasos = await _medir_latencia(directo())
+        print(f"  Llamada directa:   {_resumen(retrasos)}  ({resultado['segundos']:.2f} s)")
+
+        async with BibliotecaAsync() as fachada:
+            resultado, retrasos = await _medir_latencia(fachada.importar_catalogo(archivo))
+            print(f"  BibliotecaAsync:   {_resumen(retrasos)}  ({resultado['segundos']:.2f} s)")
+
+            # Reportes lanzados a la vez mientras se exporta el catálogo
+            salida = os.path.join(directorio, 'exportado.txt')
+            reportes = asyncio.gather(
+                fachada.exportar_catalogo(salida),
+                fachada.libros_mas_prestados(),
+                fachada.estadisticas_categoria('Categoría 3'),
+                fachada.buscar_por_rango_anios(1950, 1960),
+                fachada.reporte_financiero()
+            )
+            _, retrasos = await _medir_latencia(reportes)
+            print(f"  Reportes + export: {_resumen(retrasos)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
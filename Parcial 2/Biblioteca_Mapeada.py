@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Catálogo de solo lectura mapeado en memoria, para procesos lectores.
+
+El proceso escritor (un SistemaBiblioteca) publica el catálogo en un archivo
+con publicar_catalogo; cada proceso de búsqueda lo abre con CatalogoMapeado,
+que no copia nada al abrir: las páginas del archivo las comparte el sistema
+operativo entre todos los procesos que lo mapean.
+
+Estudiante: [Santiago Rico Cardona]
+Fecha: [21/10/25]
+"""
+
+from array import array
+from collections import defaultdict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import bisect
+import mmap
+import os
+import struct
+import sys
+import time
+
+from Sistema_Biblioteca import SistemaBiblioteca
+
+
+# ===========================================================================
+# FORMATO DEL ARCHIVO
+# ===========================================================================
+#
+# Cabecera, seguida de secciones alineadas a 8 bytes:
+#   registros       Un registro de ancho fijo por libro, en orden de inserción
+#   indice          Tabla hash de direccionamiento abierto: ISBN -> registro + 1
+#   categorias      (inicio, largo) de las categorías distintas en las cadenas
+#   inicios_titulo  Inicio de cada título en texto_titulo (uno más al final)
+#   inicios_autor   Ídem para texto_autor
+#   texto_titulo    Títulos en minúsculas terminados en '\0' (para buscar con find)
+#   texto_autor     Autores en minúsculas terminados en '\0'
+#   cadenas         Textos originales en UTF-8, sin repetidos
+
+_FIRMA_CATALOGO = b'CATMAP01'
+_SECCIONES = ('registros', 'indice', 'categorias', 'inicios_titulo', 'inicios_autor',
+              'texto_titulo', 'texto_autor', 'cadenas')
+# Firma, orden de bytes, libros, ranuras del índice y (inicio, tamaño) por sección
+_CABECERA_CATALOGO = struct.Struct('<8sB7xQQ' + 'QQ' * len(_SECCIONES))
+
+# Registro: ISBN, (inicio, largo) de título, autor y categoría en las cadenas,
+# año, copias totales y disponibles. 48 bytes = 12 enteros de 32 bits.
+_REGISTRO = struct.Struct('<QIIIIIIiii4x')
+_ENTEROS_POR_REGISTRO = _REGISTRO.size // 4
+_ISBNS_POR_REGISTRO = _REGISTRO.size // 8
+_CAMPO_CATEGORIA = 6
+_CAMPO_ANIO = 8
+
+_MULTIPLICADOR_HASH = 0x9E3779B97F4A7C15
+_MASCARA_64 = (1 << 64) - 1
+
+
+def _ranura_inicial(isbn_entero, bits):
+    """Hash multiplicativo (Fibonacci) del ISBN a una ranura de 2**bits."""
+    return ((isbn_entero * _MULTIPLICADOR_HASH) & _MASCARA_64) >> (64 - bits)
+
+
+# ===========================================================================
+# ESCRITURA (PROCESO ESCRITOR)
+# ===========================================================================
+
+def publicar_catalogo(biblioteca, archivo='catalogo.map'):
+    """
+    Escribe el catálogo de un SistemaBiblioteca en formato mapeable.
+
+    El archivo se escribe aparte y se renombra, de modo que los lectores
+    que ya lo tienen abierto siguen viendo la versión anterior hasta que
+    llaman a recargar(). Las copias disponibles quedan fijas al momento
+    de publicar.
+
+    Returns:
+        int: Tamaño del archivo en bytes
+    """
+    with biblioteca._cerrojo_indices:
+        libros = list(biblioteca.catalogo.items())
+
+    cadenas = bytearray()
+    desplazamientos = {}
+
+    def cadena(texto):
+        ubicacion = desplazamientos.get(texto)
+        if ubicacion is None:
+            datos = texto.encode('utf-8')
+            ubicacion = desplazamientos[texto] = (len(cadenas), len(datos))
+            cadenas.extend(datos)
+        return ubicacion
+
+    registros = bytearray(_REGISTRO.size * len(libros))
+    categorias = {}
+    partes_titulo, partes_autor = [], []
+    inicios_titulo, inicios_autor = array('Q', [0]), array('Q', [0])
+    for i, (isbn, info) in enumerate(libros):
+        if not (len(isbn) == 13 and isbn.isdigit()):
+            raise ValueError(f"ISBN {isbn} no es un string de 13 dígitos.")
+        categoria = cadena(info.categoria)
+        categorias[categoria] = None
+        _REGISTRO.pack_into(registros, i * _REGISTRO.size, int(isbn), *cadena(info.titulo), *cadena(info.autor),
+                            *categoria, info.anio, info.copias_total, info.copias_disponibles)
+        for texto, partes, inicios in ((info.titulo, partes_titulo, inicios_titulo),
+                                       (info.autor, partes_autor, inicios_autor)):
+            datos = texto.lower().encode('utf-8') + b'\0'
+            partes.append(datos)
+            inicios.append(inicios[-1] + len(datos))
+
+    # Tabla al menos al doble de los libros: sondeos lineales cortos
+    bits = max(4, (2 * len(libros)).bit_length())
+    indice = array('I', bytes(4 * (1 << bits)))
+    mascara = (1 << bits) - 1
+    for i, (isbn, _) in enumerate(libros):
+        ranura = _ranura_inicial(int(isbn), bits)
+        while indice[ranura]:
+            ranura = (ranura + 1) & mascara
+        indice[ranura] = i + 1
+
+    contenidos = (registros, indice.tobytes(), array('Q', [v for par in categorias for v in par]).tobytes(),
+                  inicios_titulo.tobytes(), inicios_autor.tobytes(),
+                  b''.join(partes_titulo), b''.join(partes_autor), bytes(cadenas))
+
+    ubicaciones = []
+    posicion = _CABECERA_CATALOGO.size
+    for contenido in contenidos:
+        ubicaciones.extend((posicion, len(contenido)))
+        posicion += len(contenido) + (-len(contenido) % 8)
+
+    temporal = archivo + '.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(_CABECERA_CATALOGO.pack(_FIRMA_CATALOGO, sys.byteorder == 'little', len(libros),
+                                        1 << bits, *ubicaciones))
+        for contenido in contenidos:
+            f.write(contenido)
+            f.write(b'\0' * (-len(contenido) % 8))
+        tamano = f.tell()
+    os.replace(temporal, archivo)
+    return tamano
+
+
+# ===========================================================================
+# LECTURA (PROCESOS LECTORES)
+# ===========================================================================
+
+class CatalogoMapeado(Mapping):
+    """
+    Catálogo de solo lectura sobre un archivo de publicar_catalogo.
+
+    Se usa como el dict catalogo de SistemaBiblioteca ({isbn: datos del
+    libro}, en orden de inserción) y ofrece buscar_libros e iterar_libros
+    con los mismos criterios y resultados. Abrirlo solo lee la cabecera:
+    los datos se decodifican a medida que se consultan.
+
+    - Búsqueda por ISBN: tabla hash con sondeo lineal, O(1).
+    - Búsqueda por texto: mmap.find sobre los títulos o autores en
+      minúsculas, en el orden del archivo.
+    """
+
+    def __init__(self, archivo='catalogo.map'):
+        self.archivo = archivo
+        self._mapa = None
+        self._abrir()
+
+    def _abrir(self):
+        with open(self.archivo, 'rb') as f:
+            self._inodo = os.fstat(f.fileno()).st_ino
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(mapa) < _CABECERA_CATALOGO.size:
+            mapa.close()
+            raise ValueError("Archivo de catálogo incompleto.")
+        firma, little_endian, num_libros, num_ranuras, *ubicaciones = _CABECERA_CATALOGO.unpack_from(mapa)
+        if firma != _FIRMA_CATALOGO:
+            mapa.close()
+            raise ValueError("El archivo no es un catálogo mapeado de la biblioteca.")
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            mapa.close()
+            raise ValueError("El catálogo se generó con otro orden de bytes.")
+
+        self._mapa = mapa
+        self._vista = vista = memoryview(mapa)
+        secciones = {}
+        for nombre, inicio, tamano in zip(_SECCIONES, ubicaciones[::2], ubicaciones[1::2]):
+            secciones[nombre] = (inicio, tamano)
+        self._secciones = secciones
+
+        def seccion(nombre, codigo):
+            inicio, tamano = secciones[nombre]
+            return vista[inicio:inicio + tamano].cast(codigo)
+
+        self._num_libros = num_libros
+        self._bits = num_ranuras.bit_length() - 1
+        self._registros = seccion('registros', 'B')
+        self._enteros = seccion('registros', 'i')
+        self._enteros_64 = seccion('registros', 'Q')
+        self._indice = seccion('indice', 'I')
+        self._inicios = {'titulo': seccion('inicios_titulo', 'Q'), 'autor': seccion('inicios_autor', 'Q')}
+        self._cadenas = seccion('cadenas', 'B')
+
+        # Categorías normalizadas: {categoria.lower(): {inicio en cadenas}}
+        self._categorias = defaultdict(set)
+        pares = seccion('categorias', 'Q').tolist()
+        for inicio, largo in zip(pares[::2], pares[1::2]):
+            self._categorias[self._texto(inicio, largo).lower()].add(inicio)
+
+    def cerrar(self):
+        """Libera el mapeo del archivo."""
+        if self._mapa is not None:
+            for vista in (self._registros, self._enteros, self._enteros_64, self._indice, self._cadenas,
+                          *self._inicios.values(), self._vista):
+                vista.release()
+            self._mapa.close()
+            self._mapa = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def recargar(self):
+        """
+        Vuelve a mapear el archivo si el escritor publicó una versión nueva.
+
+        Returns:
+            bool: True si se recargó
+        """
+        if os.stat(self.archivo).st_ino == self._inodo:
+            return False
+        self.cerrar()
+        self._abrir()
+        return True
+
+    # -----------------------------------------------------------------------
+    # Registros
+    # -----------------------------------------------------------------------
+
+    def _texto(self, inicio, largo):
+        return self._cadenas[inicio:inicio + largo].tobytes().decode('utf-8')
+
+    def _fila(self, isbn):
+        """Número de registro de un ISBN, o -1 si no está."""
+        if not (isinstance(isbn, str) and len(isbn) == 13 and isbn.isdigit()):
+            return -1
+        isbn_entero = int(isbn)
+        indice = self._indice
+        mascara = len(indice) - 1
+        ranura = _ranura_inicial(isbn_entero, self._bits)
+        while True:
+            valor = indice[ranura]
+            if not valor:
+                return -1
+            if self._enteros_64[(valor - 1) * _ISBNS_POR_REGISTRO] == isbn_entero:
+                return valor - 1
+            ranura = (ranura + 1) & mascara
+
+    def _libro(self, fila):
+        """Datos de un registro como dict (los mismos campos que Libro)."""
+        (_, titulo, largo_titulo, autor, largo_autor, categoria, largo_categoria,
+         anio, copias_total, copias_disponibles) = _REGISTRO.unpack_from(self._registros, fila * _REGISTRO.size)
+        return {
+            'titulo': self._texto(titulo, largo_titulo),
+            'autor': self._texto(autor, largo_autor),
+            'anio': anio,
+            'categoria': self._texto(categoria, largo_categoria),
+            'copias_total': copias_total,
+            'copias_disponibles': copias_disponibles
+        }
+
+    def _isbn(self, fila):
+        return f"{self._enteros_64[fila * _ISBNS_POR_REGISTRO]:013d}"
+
+    def __getitem__(self, isbn):
+        fila = self._fila(isbn)
+        if fila < 0:
+            raise KeyError(isbn)
+        return self._libro(fila)
+
+    def __contains__(self, isbn):
+        return self._fila(isbn) >= 0
+
+    def __iter__(self):
+        return (self._isbn(fila) for fila in range(self._num_libros))
+
+    def __len__(self):
+        return self._num_libros
+
+    # -----------------------------------------------------------------------
+    # Búsquedas
+    # -----------------------------------------------------------------------
+
+    def _filas_texto(self, campo, valor_lower):
+        """Registros cuyo campo contiene valor_lower, buscando con mmap.find."""
+        if not valor_lower:
+            yield from range(self._num_libros)
+            return
+
+        aguja = valor_lower.encode('utf-8')
+        inicios = self._inicios[campo]
+        base, tamano = self._secciones['texto_' + campo]
+        fin = base + tamano
+        buscar = self._mapa.find
+        posicion = base
+        while True:
+            encontrado = buscar(aguja, posicion, fin)
+            if encontrado < 0:
+                return
+            fila = bisect.bisect_right(inicios, encontrado - base) - 1
+            # El final de la coincidencia debe caer antes del '\0' del libro.
+            if encontrado - base + len(aguja) < inicios[fila + 1]:
+                yield fila
+                posicion = base + inicios[fila + 1]
+            else:
+                posicion = encontrado + 1
+
+    def _filas_busqueda(self, criterio, valor, categoria):
+        """Iterador de los registros que cumplen una búsqueda, en orden de inserción."""
+        valor_lower = str(valor).lower()
+        if criterio in ('titulo', 'autor'):
+            filas = self._filas_texto(criterio, valor_lower)
+        elif criterio == 'anio':
+            # Misma comparación textual que SistemaBiblioteca ('0195' no es 195).
+            if valor_lower.isdigit() and str(int(valor_lower)) == valor_lower:
+                anio = int(valor_lower)
+                columna = self._enteros[_CAMPO_ANIO::_ENTEROS_POR_REGISTRO].tolist()
+                filas = (fila for fila, valor_anio in enumerate(columna) if valor_anio == anio)
+            else:
+                filas = iter(())
+        else:
+            filas = iter(())
+
+        if categoria is None:
+            return filas
+        desplazamientos = self._categorias.get(categoria.lower(), ())
+        enteros = self._enteros
+        return (fila for fila in filas
+                if enteros[fila * _ENTEROS_POR_REGISTRO + _CAMPO_CATEGORIA] in desplazamientos)
+
+    def buscar_libros(self, criterio='titulo', valor='', categoria=None):
+        """Igual que SistemaBiblioteca.buscar_libros."""
+        return [{'isbn': self._isbn(fila), **self._libro(fila)}
+                for fila in self._filas_busqueda(criterio, valor, categoria)]
+
+    def iterar_libros(self, criterio='titulo', valor='', categoria=None, offset=0, limite=None):
+        """Versión perezosa y paginada de buscar_libros (ver SistemaBiblioteca.iterar_libros)."""
+        filas = self._filas_busqueda(criterio, valor, categoria)
+        fin = None if limite is None else offset + limite
+        for fila in islice(filas, offset, fin):
+            yield {'isbn': self._isbn(fila), **self._libro(fila)}
+
+
+# ===========================================================================
+# BENCHMARK: VARIOS PROCESOS LECTORES
+# ===========================================================================
+
+_CONSULTAS = ('amor', 'noche', 'río', 'sombra del', 'borges', 'xyz')
+
+
+def _lector_importando(archivo_texto):
+    """Lector que carga su propia copia del catálogo; retorna (segundos de arranque, resultados)."""
+    inicio = time.perf_counter()
+    sistema = SistemaBiblioteca()
+    sistema.importar_catalogo(archivo_texto)
+    arranque = time.perf_counter() - inicio
+    return arranque, sum(len(sistema.buscar_libros('titulo', consulta)) for consulta in _CONSULTAS)
+
+
+def _lector_mapeado(archivo_mapa):
+    """Lector sobre el catálogo mapeado; retorna (segundos de arranque, resultados)."""
+    inicio = time.perf_counter()
+    with CatalogoMapeado(archivo_mapa) as catalogo:
+        arranque = time.perf_counter() - inicio
+        return arranque, sum(len(catalogo.buscar_libros('titulo', consulta)) for consulta in _CONSULTAS)
+
+
+def benchmark(escala=200000, lectores=4):
+    """Arranque y búsquedas de varios lectores: importando vs. mapeando."""
+    import tempfile
+    from contextlib import redirect_stdout
+    import io
+
+    from Benchmark_Biblioteca import generar_biblioteca
+
+    biblioteca, isbns, _ = generar_biblioteca(escala)
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo_texto = os.path.join(directorio, 'catalogo.txt')
+        archivo_mapa = os.path.join(directorio, 'catalogo.map')
+        with redirect_stdout(io.StringIO()):
+            biblioteca.exportar_catalogo(archivo_texto)
+        inicio = time.perf_counter()
+        tamano = publicar_catalogo(biblioteca, archivo_mapa)
+        print(f"\n{escala:,} libros; catálogo mapeado de {tamano / 2**20:.1f} MB "
+              f"publicado en {time.perf_counter() - inicio:.2f} s")
+
+        with ProcessPoolExecutor(max_workers=lectores) as ejecutor:
+            for nombre, lector, archivo in (('Importando', _lector_importando, archivo_texto),
+                                            ('Mapeado', _lector_mapeado, archivo_mapa)):
+                resultados = list(ejecutor.map(lector, [archivo] * lectores))
+                arranques = [arranque for arranque, _ in resultados]
+                print(f"  {nombre:<11} arranque por lector: {min(arranques) * 1000:9.2f} ms "
+                      f"- {max(arranques) * 1000:9.2f} ms  (resultados: {resultados[0][1]:,})")
+
+        with CatalogoMapeado(archivo_mapa) as catalogo:
+            for consulta in _CONSULTAS:
+                inicio = time.perf_counter()
+                mapeado = catalogo.buscar_libros('titulo', consulta)
+                t_mapeado = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                en_memoria = biblioteca.buscar_libros('titulo', consulta)
+                t_memoria = time.perf_counter() - inicio
+                assert mapeado == en_memoria
+                print(f"  buscar '{consulta}': {len(mapeado):7,} libros  mapeado {t_mapeado * 1000:8.2f} ms"
+                      f"  en memoria {t_memoria * 1000:8.2f} ms")
+
+            consultas = isbns[::max(1, escala // 10000)]
+            inicio = time.perf_counter()
+            for isbn in consultas:
+                catalogo[isbn]
+            print(f"  Búsqueda por ISBN: {(time.perf_counter() - inicio) / len(consultas) * 1e6:.2f} µs")
+
+
+if __name__ == "__main__":
+    benchmark()
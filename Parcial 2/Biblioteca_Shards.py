@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Sistema de Biblioteca particionado en varios procesos.
+
+Estudiante: [Santiago Rico Cardona]
+Fecha: [21/10/25]
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from multiprocessing import Pipe, Process
+from operator import itemgetter
+import heapq
+import os
+import time
+import zlib
+
+from Sistema_Biblioteca import (SistemaBiblioteca, LibroNoEncontrado, UsuarioNoRegistrado,
+                                LimitePrestamosExcedido)
+
+
+# ===========================================================================
+# PARTICIONES (PROCESOS TRABAJADORES)
+# ===========================================================================
+
+def particion_de_isbn(isbn, num_particiones):
+    """Partición de un libro. crc32 es estable entre procesos (hash() no)."""
+    return zlib.crc32(isbn.encode('utf-8')) % num_particiones
+
+
+def particion_de_prestamo(id_prestamo, num_particiones):
+    """Partición que generó un ID de préstamo (ver _Particion)."""
+    return (int(id_prestamo[1:]) - 1) % num_particiones
+
+
+class _Particion(SistemaBiblioteca):
+    """
+    SistemaBiblioteca de un trabajador.
+
+    Los IDs de préstamo van intercalados: la partición k de n genera
+    P(k+1), P(k+1+n), P(k+1+2n)... así el número del ID indica su partición
+    sin consultar a nadie.
+    """
+
+    def __init__(self, indice, num_particiones, **opciones):
+        super().__init__(**opciones)
+        self._paso_ids = num_particiones
+        self._next_prestamo_id = indice + 1
+
+    def _get_next_prestamo_id(self):
+        id_p = f"P{self._next_prestamo_id:05d}"
+        self._next_prestamo_id += self._paso_ids
+        return id_p
+
+
+def _trabajador(conexion, indice, num_particiones, opciones):
+    """Bucle de un proceso trabajador: recibe (metodo, args, kwargs) y responde (ok, valor)."""
+    sistema = _Particion(indice, num_particiones, **opciones)
+    while True:
+        mensaje = conexion.recv()
+        if mensaje is None:
+            break
+        metodo, args, kwargs = mensaje
+        try:
+            conexion.send((True, getattr(sistema, metodo)(*args, **kwargs)))
+        except Exception as e:
+            conexion.send((False, e))
+    conexion.close()
+
+
+# ===========================================================================
+# ENRUTADOR
+# ===========================================================================
+
+class BibliotecaParticionada:
+    """
+    Biblioteca repartida en varios procesos, cada uno con su propio
+    SistemaBiblioteca.
+
+    El catálogo y los préstamos se particionan por hash del ISBN; los
+    usuarios se registran en todas las particiones. El enrutador (este
+    objeto) envía cada operación a la partición de su libro o préstamo,
+    y resuelve búsquedas y reportes consultando todas a la vez
+    (dispersión) y combinando las respuestas (recolección).
+
+    Como los préstamos de un usuario pueden caer en particiones distintas,
+    el enrutador lleva los préstamos activos y el saldo de multas de cada
+    usuario y verifica ahí el límite de préstamos y el de multas.
+
+    El enrutador no es seguro entre hilos. El rendimiento escala con las
+    particiones cuando el trabajo llega en lotes (prestar_lote,
+    devolver_lote): cada partición procesa su parte en paralelo.
+    """
+
+    def __init__(self, num_particiones=None, dias_prestamo=14, multa_por_dia=1.0, limite_prestamos=3):
+        self.DIAS_PRESTAMO = dias_prestamo
+        self.MULTA_POR_DIA = multa_por_dia
+        self.LIMITE_PRESTAMOS = limite_prestamos
+        self.num_particiones = num_particiones or os.cpu_count() or 1
+
+        opciones = {'dias_prestamo': dias_prestamo, 'multa_por_dia': multa_por_dia,
+                    'limite_prestamos': limite_prestamos}
+        self._conexiones = []
+        self._procesos = []
+        for indice in range(self.num_particiones):
+            propia, remota = Pipe()
+            proceso = Process(target=_trabajador, args=(remota, indice, self.num_particiones, opciones),
+                              daemon=True)
+            proceso.start()
+            remota.close()
+            self._conexiones.append(propia)
+            self._procesos.append(proceso)
+
+        # Orden de alta de cada libro, para devolver las búsquedas en ese orden
+        self._orden_libros = {}
+        self._usuarios = set()
+        # Estado global por usuario: {id_usuario: {id_prestamo: fecha_vencimiento}}
+        self._activos = defaultdict(dict)
+        self._usuario_prestamo = {}
+        self._saldo_multas = defaultdict(float)
+        # Multas de préstamos devueltos aún sin pagar: {id_prestamo: (id_usuario, multa)}
+        self._multas_sin_pagar = {}
+
+    def cerrar(self):
+        """Detiene los procesos trabajadores."""
+        for conexion in self._conexiones:
+            conexion.send(None)
+            conexion.close()
+        for proceso in self._procesos:
+            proceso.join()
+        self._conexiones = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # -----------------------------------------------------------------------
+    # Comunicación con las particiones
+    # -----------------------------------------------------------------------
+
+    def _llamar(self, particion, metodo, *args, **kwargs):
+        """Ejecuta un método en una partición y retorna su resultado."""
+        return self._dispersar({particion: (metodo, args, kwargs)})[particion]
+
+    def _dispersar(self, llamadas):
+        """
+        Envía {particion: (metodo, args, kwargs)} a todas las particiones y
+        después recoge las respuestas, de modo que trabajan en paralelo.
+
+        Si alguna falla se lanza la primera excepción, tras recogerlas todas.
+        """
+        for particion, mensaje in llamadas.items():
+            self._conexiones[particion].send(mensaje)
+
+        resultados = {}
+        error = None
+        for particion in llamadas:
+            ok, valor = self._conexiones[particion].recv()
+            if ok:
+                resultados[particion] = valor
+            elif error is None:
+                error = valor
+        if error is not None:
+            raise error
+        return resultados
+
+    def _a_todas(self, metodo, *args, **kwargs):
+        """Ejecuta un método en todas las particiones; retorna la lista de resultados."""
+        resultados = self._dispersar({p: (metodo, args, kwargs) for p in range(self.num_particiones)})
+        return [resultados[p] for p in range(self.num_particiones)]
+
+    # -----------------------------------------------------------------------
+    # Catálogo y usuarios
+    # -----------------------------------------------------------------------
+
+    def agregar_libro(self, isbn, titulo, autor, anio, categoria, copias):
+        self._llamar(particion_de_isbn(isbn, self.num_particiones), 'agregar_libro',
+                     isbn, titulo, autor, anio, categoria, copias)
+        self._orden_libros[isbn] = len(self._orden_libros)
+
+    def actualizar_copias(self, isbn, cantidad_cambio):
+        self._llamar(particion_de_isbn(isbn, self.num_particiones), 'actualizar_copias', isbn, cantidad_cambio)
+
+    def registrar_usuario(self, id_usuario, nombre, email):
+        if id_usuario in self._usuarios:
+            raise ValueError(f"ID de usuario '{id_usuario}' ya está registrado.")
+        self._a_todas('registrar_usuario', id_usuario, nombre, email)
+        self._usuarios.add(id_usuario)
+
+    def buscar_libros(self, criterio='titulo', valor='', categoria=None):
+        """Busca en todas las particiones y ordena por orden de alta."""
+        resultados = [libro for parcial in self._a_todas('buscar_libros', criterio, valor, categoria)
+                      for libro in parcial]
+        resultados.sort(key=lambda libro: self._orden_libros[libro['isbn']])
+        return resultados
+
+    # -----------------------------------------------------------------------
+    # Préstamos
+    # -----------------------------------------------------------------------
+
+    def _multas_pendientes(self, id_usuario, hoy):
+        """Saldo sin pagar más multas de préstamos activos vencidos."""
+        dias_retraso = 0
+        for fecha_vencimiento in self._activos[id_usuario].values():
+            if hoy > fecha_vencimiento:
+                dias_retraso += (hoy - fecha_vencimiento).days
+        return round(self._saldo_multas[id_usuario] + dias_retraso * self.MULTA_POR_DIA, 2)
+
+    def _validar_prestamo(self, isbn, id_usuario, hoy, pendientes=0):
+        """
+        Verifica lo que exige una vista global: usuario, existencia del libro,
+        límite de préstamos y multas. La disponibilidad de copias la verifica
+        la partición, así que si el usuario está en su límite se informa el
+        límite aunque el libro tampoco tenga copias.
+        """
+        if id_usuario not in self._usuarios:
+            raise UsuarioNoRegistrado(id_usuario)
+        if isbn not in self._orden_libros:
+            raise LibroNoEncontrado(isbn)
+        if len(self._activos[id_usuario]) + pendientes >= self.LIMITE_PRESTAMOS:
+            raise LimitePrestamosExcedido(id_usuario, self.LIMITE_PRESTAMOS)
+        SistemaBiblioteca._verificar_multas(id_usuario, self._multas_pendientes(id_usuario, hoy))
+
+    def _anotar_prestamo(self, id_prestamo, id_usuario, fecha_vencimiento):
+        self._activos[id_usuario][id_prestamo] = fecha_vencimiento
+        self._usuario_prestamo[id_prestamo] = id_usuario
+
+    def _anotar_devolucion(self, id_prestamo, multa):
+        id_usuario = self._usuario_prestamo.pop(id_prestamo, None)
+        if id_usuario is None:
+            return
+        del self._activos[id_usuario][id_prestamo]
+        if multa > 0:
+            self._saldo_multas[id_usuario] += multa
+            self._multas_sin_pagar[id_prestamo] = (id_usuario, multa)
+
+    def prestar_libro(self, isbn, id_usuario):
+        hoy = date.today()
+        self._validar_prestamo(isbn, id_usuario, hoy)
+        id_prestamo = self._llamar(particion_de_isbn(isbn, self.num_particiones), 'prestar_libro',
+                                   isbn, id_usuario)
+        self._anotar_prestamo(id_prestamo, id_usuario, hoy + timedelta(days=self.DIAS_PRESTAMO))
+        return id_prestamo
+
+    def devolver_libro(self, id_prestamo):
+        resultado = self._llamar(particion_de_prestamo(id_prestamo, self.num_particiones),
+                                 'devolver_libro', id_prestamo)
+        self._anotar_devolucion(id_prestamo, resultado['multa'])
+        return resultado
+
+    def renovar_prestamo(self, id_prestamo):
+        mensaje = self._llamar(particion_de_prestamo(id_prestamo, self.num_particiones),
+                               'renovar_prestamo', id_prestamo)
+        id_usuario = self._usuario_prestamo[id_prestamo]
+        self._activos[id_usuario][id_prestamo] += timedelta(days=self.DIAS_PRESTAMO)
+        return mensaje
+
+    def pagar_multa(self, id_prestamo):
+        monto = self._llamar(particion_de_prestamo(id_prestamo, self.num_particiones),
+                             'pagar_multa', id_prestamo)
+        id_usuario, multa = self._multas_sin_pagar.pop(id_prestamo)
+        saldo = self._saldo_multas[id_usuario] - multa
+        self._saldo_multas[id_usuario] = saldo if saldo > 0.005 else 0.0
+        return monto
+
+    def prestar_lote(self, solicitudes):
+        """
+        Realiza varios préstamos; cada partición procesa su parte en paralelo.
+
+        Los límites de cada usuario se verifican en el enrutador antes de
+        repartir el lote, contando también las solicitudes anteriores del
+        mismo lote (aunque luego la partición las rechace por falta de copias).
+
+        Returns:
+            list: Por cada solicitud, el ID del préstamo o la excepción.
+        """
+        hoy = date.today()
+        fecha_vencimiento = hoy + timedelta(days=self.DIAS_PRESTAMO)
+        resultados = []
+        por_particion = defaultdict(list)
+        posiciones = defaultdict(list)
+        pendientes = defaultdict(int)
+
+        for posicion, (isbn, id_usuario) in enumerate(solicitudes):
+            try:
+                self._validar_prestamo(isbn, id_usuario, hoy, pendientes[id_usuario])
+            except (UsuarioNoRegistrado, LibroNoEncontrado, LimitePrestamosExcedido, ValueError) as e:
+                resultados.append(e)
+                continue
+            pendientes[id_usuario] += 1
+            particion = particion_de_isbn(isbn, self.num_particiones)
+            por_particion[particion].append((isbn, id_usuario))
+            posiciones[particion].append(posicion)
+            resultados.append(None)
+
+        respuestas = self._dispersar({p: ('prestar_lote', (lote,), {}) for p, lote in por_particion.items()})
+        for particion, parcial in respuestas.items():
+            for posicion, (_, id_usuario), resultado in zip(posiciones[particion], por_particion[particion], parcial):
+                if not isinstance(resultado, Exception):
+                    self._anotar_prestamo(resultado, id_usuario, fecha_vencimiento)
+                resultados[posicion] = resultado
+        return resultados
+
+    def devolver_lote(self, ids_prestamo):
+        """Procesa varias devoluciones; cada partición procesa su parte en paralelo."""
+        ids_prestamo = list(ids_prestamo)
+        por_particion = defaultdict(list)
+        posiciones = defaultdict(list)
+        for posicion, id_prestamo in enumerate(ids_prestamo):
+            particion = particion_de_prestamo(id_prestamo, self.num_particiones)
+            por_particion[particion].append(id_prestamo)
+            posiciones[particion].append(posicion)
+
+        resultados = [None] * len(ids_prestamo)
+        respuestas = self._dispersar({p: ('devolver_lote', (lote,), {}) for p, lote in por_particion.items()})
+        for particion, parcial in respuestas.items():
+            for posicion, id_prestamo, resultado in zip(posiciones[particion], por_particion[particion], parcial):
+                if not isinstance(resultado, Exception):
+                    self._anotar_devolucion(id_prestamo, resultado['multa'])
+                resultados[posicion] = resultado
+        return resultados
+
+    # -----------------------------------------------------------------------
+    # Reportes (dispersión y recolección)
+    # -----------------------------------------------------------------------
+
+    def libros_mas_prestados(self, n=10):
+        """Cada partición aporta su top N (sus libros son disjuntos) y se combinan."""
+        candidatos = [fila for parcial in self._a_todas('libros_mas_prestados', n) for fila in parcial]
+        return heapq.nlargest(n, candidatos, key=itemgetter(2))
+
+    def reporte_financiero(self, fecha_inicio=None, fecha_fin=None):
+        """Suma los acumulados (en centavos) de cada partición y arma el reporte."""
+        parciales = self._a_todas('_acumulados_financieros', fecha_inicio, fecha_fin)
+        return SistemaBiblioteca._formatear_reporte_financiero(*(sum(campo) for campo in zip(*parciales)))
+
+
+# ===========================================================================
+# BENCHMARK
+# ===========================================================================
+
+def _cargar(biblioteca, num_libros, num_usuarios):
+    for i in range(num_libros):
+        biblioteca.agregar_libro(f"{9780000000000 + i}", f"Título {i}", f"Autor {i % 50}", 1950 + i % 70,
+                                 f"Categoría {i % 8}", 50)
+    for u in range(num_usuarios):
+        biblioteca.registrar_usuario(f"U{u}", f"Usuario {u}", f"u{u}@correo.com")
+
+
+def benchmark(num_libros=2000, num_usuarios=20000, tamano_lote=20000, rondas=5):
+    """Préstamos y devoluciones por segundo en lotes, con 1..N particiones."""
+    import random
+
+    azar = random.Random(7)
+    lotes = [[(f"{9780000000000 + azar.randrange(num_libros)}", f"U{azar.randrange(num_usuarios)}")
+              for _ in range(tamano_lote)] for _ in range(rondas)]
+
+    def medir(biblioteca):
+        _cargar(biblioteca, num_libros, num_usuarios)
+        operaciones = 0
+        inicio = time.perf_counter()
+        for lote in lotes:
+            ids = [r for r in biblioteca.prestar_lote(lote) if isinstance(r, str)]
+            biblioteca.devolver_lote(ids)
+            operaciones += len(lote) + len(ids)
+        return operaciones / (time.perf_counter() - inicio)
+
+    print(f"\nNúcleos disponibles: {os.cpu_count()}")
+    print(f"Un solo proceso:      {medir(SistemaBiblioteca(limite_prestamos=3)):>10,.0f} op/s")
+
+    particiones = 1
+    while particiones <= max(2, os.cpu_count() or 1):
+        with BibliotecaParticionada(particiones, limite_prestamos=3) as biblioteca:
+            print(f"{particiones} partición(es):     {medir(biblioteca):>10,.0f} op/s")
+        particiones *= 2
+
+
+if __name__ == "__main__":
+    benchmark()
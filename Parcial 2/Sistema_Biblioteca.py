@@ -5,9 +5,34 @@ Estudiante: [Santiago Rico Cardona]
 Fecha: [21/10/25]
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from array import array
+from collections import defaultdict, Counter, OrderedDict, deque
+from collections.abc import Mapping, MutableMapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import partial, wraps
+from itertools import islice
+from operator import itemgetter
+import bisect
+import bz2
+import csv
+import gzip
+import heapq
+import io
+import json
+import lzma
+import mmap
 import os
+import struct
+import sys
+import threading
+import time
+import traceback
 import random
+import re
+import unicodedata
+
 
 # ===========================================================================
 # EXCEPCIONES PERSONALIZADAS (5 puntos)
@@ -15,7 +40,11 @@ import random
 
 class ErrorBiblioteca(Exception):
     """Excepción base para el sistema de biblioteca."""
-    pass
+    
+    def __reduce__(self):
+        # Las subclases reciben argumentos propios en __init__: al serializarlas
+        # (p. ej. para enviarlas entre procesos) se restauran sin llamarlo.
+        return (_restaurar_error, (type(self), self.args, self.__dict__))
 
 
 class LibroNoEncontrado(ErrorBiblioteca):
@@ -56,6 +85,767 @@ class PrestamoVencido(ErrorBiblioteca):
         super().__init__(f"Préstamo {id_prestamo} está vencido por {dias_retraso} días")
 
 
+def _restaurar_error(clase, args, atributos):
+    error = clase.__new__(clase)
+    error.args = args
+    error.__dict__.update(atributos)
+    return error
+
+
+# ===========================================================================
+# REGISTROS DE DATOS
+# ===========================================================================
+
+class _Registro(MutableMapping):
+    """
+    Registro compacto con __slots__ que también se comporta como dict.
+    
+    Internamente se usa acceso por atributo (prestamo.isbn); el acceso por
+    clave (prestamo['isbn']), ** y dict(registro) siguen funcionando para el
+    código que esperaba diccionarios. No se pueden agregar ni borrar claves.
+    """
+    __slots__ = ()
+    
+    def __getitem__(self, clave):
+        if clave not in self.__slots__:
+            raise KeyError(clave)
+        return getattr(self, clave)
+    
+    def __setitem__(self, clave, valor):
+        if clave not in self.__slots__:
+            raise KeyError(clave)
+        setattr(self, clave, valor)
+    
+    def __delitem__(self, clave):
+        raise TypeError(f"No se pueden borrar campos de {type(self).__name__}")
+    
+    def __iter__(self):
+        return iter(self.__slots__)
+    
+    def __len__(self):
+        return len(self.__slots__)
+    
+    def __contains__(self, clave):
+        return clave in self.__slots__
+    
+    def get(self, clave, predeterminado=None):
+        if clave not in self.__slots__:
+            return predeterminado
+        return getattr(self, clave)
+    
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class Libro(_Registro):
+    """Libro del catálogo."""
+    __slots__ = ('titulo', 'autor', 'anio', 'categoria', 'copias_total', 'copias_disponibles')
+    
+    def __init__(self, titulo, autor, anio, categoria, copias_total, copias_disponibles):
+        self.titulo = titulo
+        self.autor = autor
+        self.anio = anio
+        self.categoria = categoria
+        self.copias_total = copias_total
+        self.copias_disponibles = copias_disponibles
+
+
+class VistaLibro(Mapping):
+    """
+    Vista de solo lectura de un libro del catálogo junto con su ISBN.
+    
+    No copia los campos: refleja el estado actual del libro. Admite acceso
+    por clave (vista['titulo']), por atributo (vista.titulo) y dict(vista).
+    """
+    __slots__ = ('isbn', '_libro')
+    
+    def __init__(self, isbn, libro):
+        self.isbn = isbn
+        self._libro = libro
+    
+    def __getattr__(self, nombre):
+        if nombre in Libro.__slots__:
+            return getattr(self._libro, nombre)
+        raise AttributeError(nombre)
+    
+    def __getitem__(self, clave):
+        if clave == 'isbn':
+            return self.isbn
+        return self._libro[clave]
+    
+    def __iter__(self):
+        yield 'isbn'
+        yield from Libro.__slots__
+    
+    def __len__(self):
+        return len(Libro.__slots__) + 1
+    
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class Usuario(_Registro):
+    """Usuario registrado."""
+    __slots__ = ('nombre', 'email', 'fecha_registro', 'prestamos_activos', 'historial')
+    
+    def __init__(self, nombre, email, fecha_registro, prestamos_activos=None, historial=None):
+        self.nombre = nombre
+        self.email = email
+        self.fecha_registro = fecha_registro
+        self.prestamos_activos = set() if prestamos_activos is None else prestamos_activos
+        self.historial = [] if historial is None else historial
+
+
+class Prestamo(_Registro):
+    """Préstamo de un libro (activo o devuelto)."""
+    __slots__ = ('isbn', 'id_usuario', 'fecha_prestamo', 'fecha_vencimiento',
+                 'fecha_devolucion', 'multa', 'pagada')
+    
+    def __init__(self, isbn, id_usuario, fecha_prestamo, fecha_vencimiento,
+                 fecha_devolucion=None, multa=0.0, pagada=False):
+        self.isbn = isbn
+        self.id_usuario = id_usuario
+        self.fecha_prestamo = fecha_prestamo
+        self.fecha_vencimiento = fecha_vencimiento
+        self.fecha_devolucion = fecha_devolucion
+        self.multa = multa
+        self.pagada = pagada
+
+
+# Estados de una reserva; el índice es el código que se guarda en las instantáneas
+_ESTADOS_RESERVA = ('en_espera', 'asignada', 'cumplida', 'vencida', 'cancelada')
+
+
+class Reserva(_Registro):
+    """Reserva de un libro sin copias disponibles (cola de espera por ISBN)."""
+    __slots__ = ('isbn', 'id_usuario', 'fecha_reserva', 'estado', 'fecha_limite')
+    
+    def __init__(self, isbn, id_usuario, fecha_reserva, estado='en_espera', fecha_limite=None):
+        self.isbn = isbn
+        self.id_usuario = id_usuario
+        self.fecha_reserva = fecha_reserva
+        self.estado = estado
+        self.fecha_limite = fecha_limite
+
+
+# ===========================================================================
+# ESTRUCTURAS AUXILIARES
+# ===========================================================================
+
+def _centavos(monto):
+    """Convierte un monto en pesos (float con 2 decimales) a centavos enteros."""
+    return int(round(monto * 100))
+
+
+class _FenwickDiario:
+    """
+    Árbol de Fenwick sobre ordinales de día, con varias medidas por día.
+    
+    Permite sumar valores en una fecha y consultar la suma de un rango de
+    fechas en O(log días). El rango cubierto crece automáticamente.
+    
+    Las medidas son enteras (los montos, en centavos): el árbol suma y
+    resta prefijos, y con floats el resultado dependería del orden.
+    """
+    
+    def __init__(self, num_medidas):
+        self.num_medidas = num_medidas
+        self._base = 0
+        self._capacidad = 0
+        self._arboles = [[0] for _ in range(num_medidas)]
+        self._por_dia = {}
+    
+    def sumar(self, fecha, deltas):
+        """Suma deltas (una por medida) en el día indicado."""
+        ordinal = fecha.toordinal()
+        valores = self._por_dia.setdefault(ordinal, [0] * self.num_medidas)
+        for m, delta in enumerate(deltas):
+            valores[m] += delta
+        
+        if not (self._base <= ordinal < self._base + self._capacidad):
+            self._reconstruir()
+            return
+        
+        i = ordinal - self._base + 1
+        while i <= self._capacidad:
+            for m, delta in enumerate(deltas):
+                self._arboles[m][i] += delta
+            i += i & -i
+    
+    def cargar_dias(self, por_dia):
+        """Reemplaza el contenido con {ordinal: [valores]} y reconstruye una sola vez."""
+        self._por_dia = por_dia
+        if por_dia:
+            self._reconstruir()
+        else:
+            self._base = 0
+            self._capacidad = 0
+            self._arboles = [[0] for _ in range(self.num_medidas)]
+    
+    def _reconstruir(self):
+        """Reconstruye los árboles en O(días) cubriendo todos los días conocidos."""
+        minimo = min(self._por_dia)
+        maximo = max(self._por_dia)
+        self._capacidad = max(64, 2 * (maximo - minimo + 1))
+        # Margen hacia atrás para fechas algo anteriores a la primera vista.
+        self._base = minimo - self._capacidad // 4
+        
+        self._arboles = [[0] * (self._capacidad + 1) for _ in range(self.num_medidas)]
+        for ordinal, valores in self._por_dia.items():
+            for m, valor in enumerate(valores):
+                self._arboles[m][ordinal - self._base + 1] += valor
+        for arbol in self._arboles:
+            for i in range(1, self._capacidad + 1):
+                j = i + (i & -i)
+                if j <= self._capacidad:
+                    arbol[j] += arbol[i]
+    
+    def _prefijo(self, i):
+        """Suma de las primeras i posiciones, por medida."""
+        i = max(0, min(i, self._capacidad))
+        totales = [0] * self.num_medidas
+        while i > 0:
+            for m in range(self.num_medidas):
+                totales[m] += self._arboles[m][i]
+            i -= i & -i
+        return totales
+    
+    def rango(self, fecha_inicio=None, fecha_fin=None):
+        """Suma por medida entre fecha_inicio y fecha_fin (inclusive; None = sin límite)."""
+        inicio = 0 if fecha_inicio is None else fecha_inicio.toordinal() - self._base
+        fin = self._capacidad if fecha_fin is None else fecha_fin.toordinal() - self._base + 1
+        if fin <= inicio:
+            return [0] * self.num_medidas
+        hasta_fin = self._prefijo(fin)
+        hasta_inicio = self._prefijo(inicio)
+        return [a - b for a, b in zip(hasta_fin, hasta_inicio)]
+
+
+class _TablaCadenas:
+    """Tabla de cadenas sin repetidos para las instantáneas binarias."""
+    
+    def __init__(self):
+        self._ids = {}
+        self._bloques = []
+        self.desplazamientos = array('Q', [0])
+    
+    def id(self, cadena):
+        """Retorna el índice de la cadena, agregándola si es nueva."""
+        indice = self._ids.get(cadena)
+        if indice is None:
+            indice = len(self._bloques)
+            self._ids[cadena] = indice
+            datos = cadena.encode('utf-8')
+            self._bloques.append(datos)
+            self.desplazamientos.append(self.desplazamientos[-1] + len(datos))
+        return indice
+    
+    def datos(self):
+        """Retorna todas las cadenas concatenadas en UTF-8."""
+        return b''.join(self._bloques)
+
+
+# Los IDs de usuario enteros se guardan en la tabla de cadenas como NUL seguido
+# de sus dígitos, y un ID de texto que empiece con NUL lleva otro NUL delante:
+# cada ID vuelve con su tipo y las instantáneas sin IDs enteros no cambian.
+def _cadena_de_id_usuario(id_usuario):
+    """Codifica un ID de usuario (str o int) para la tabla de cadenas."""
+    if type(id_usuario) is str:
+        return '\0' + id_usuario if id_usuario.startswith('\0') else id_usuario
+    if type(id_usuario) is int:
+        return f"\0{id_usuario}"
+    raise TypeError(f"Las instantáneas solo admiten IDs de usuario str o int, "
+                    f"no {type(id_usuario).__name__}.")
+
+
+def _id_usuario_de_cadena(cadena):
+    """Inverso de _cadena_de_id_usuario."""
+    if not cadena.startswith('\0'):
+        return cadena
+    resto = cadena[1:]
+    return resto if resto.startswith('\0') else int(resto)
+
+
+class _RuedaTemporal:
+    """
+    Rueda de temporización por días para los plazos de las reservas.
+    
+    Cada elemento va a la ranura de su día (ordinal % num_ranuras), con lo que
+    agregar es O(1) y avanzar solo visita las ranuras de los días que pasaron,
+    sin importar cuántos plazos haya pendientes. Los plazos a más de
+    num_ranuras días comparten ranura y se conservan hasta que llega su vuelta.
+    """
+    
+    def __init__(self, dia_actual, num_ranuras=64):
+        self.ranuras = [[] for _ in range(num_ranuras)]
+        # Último día ya procesado por avanzar
+        self.dia = dia_actual
+        # Elementos agregados con un día ya procesado (p. ej. al reaplicar el diario)
+        self.atrasados = []
+    
+    def agregar(self, dia, elemento):
+        """Programa un elemento para el día (ordinal) indicado."""
+        if dia <= self.dia:
+            self.atrasados.append(elemento)
+        else:
+            self.ranuras[dia % len(self.ranuras)].append((dia, elemento))
+    
+    def avanzar(self, hasta):
+        """Retorna los elementos programados hasta el día `hasta` (inclusive) y los quita."""
+        vencidos, self.atrasados = self.atrasados, []
+        if hasta <= self.dia:
+            return vencidos
+        
+        num_ranuras = len(self.ranuras)
+        dias = range(self.dia + 1, hasta + 1) if hasta - self.dia < num_ranuras else range(num_ranuras)
+        for dia in dias:
+            ranura = self.ranuras[dia % num_ranuras]
+            if ranura:
+                vencidos.extend(elemento for limite, elemento in ranura if limite <= hasta)
+                self.ranuras[dia % num_ranuras] = [(limite, elemento) for limite, elemento in ranura
+                                                   if limite > hasta]
+        self.dia = hasta
+        return vencidos
+
+
+# Cabecera: firma, orden de bytes, días de préstamo, multa por día, límite,
+# siguiente ID, secuencia del diario, número de cadenas, tamaño de las cadenas,
+# libros, usuarios, préstamos.
+_FIRMA_INSTANTANEA = b'BIBLIO01'
+_CABECERA_INSTANTANEA = struct.Struct('<8sB7xIdIQQQQQQQ')
+
+# Sección opcional de reservas al final de la instantánea: firma, días de
+# reserva, siguiente ID de reserva y número de reservas. Las instantáneas
+# sin esta sección (que terminan tras los préstamos) se cargan sin reservas.
+_FIRMA_RESERVAS = b'RESERV01'
+_CABECERA_RESERVAS = struct.Struct('<8sI4xQQ')
+
+
+class DiarioOperaciones:
+    """
+    Diario de operaciones de solo anexado (write-ahead log).
+    
+    Cada operación es una línea JSON [secuencia, operacion, args]. Las líneas
+    se escriben al buffer del archivo y se sincronizan a disco (fsync) por
+    grupos: cada tamano_grupo operaciones o cada intervalo segundos, lo que
+    ocurra primero. Ante una caída se pierde como máximo el último grupo.
+    """
+    
+    def __init__(self, archivo, tamano_grupo=256, intervalo=0.05):
+        self.archivo = archivo
+        self.tamano_grupo = tamano_grupo
+        self.intervalo = intervalo
+        self._f = open(archivo, 'a', encoding='utf-8')
+        self._pendientes = 0
+        self._ultima_sincronizacion = time.monotonic()
+    
+    def registrar(self, secuencia, operacion, args):
+        """Anexa una operación y sincroniza si el grupo está completo."""
+        self._f.write(json.dumps([secuencia, operacion, args], ensure_ascii=False, separators=(',', ':')))
+        self._f.write('\n')
+        self._pendientes += 1
+        if (self._pendientes >= self.tamano_grupo or
+                time.monotonic() - self._ultima_sincronizacion >= self.intervalo):
+            self.sincronizar()
+    
+    def sincronizar(self):
+        """Escribe a disco las operaciones pendientes."""
+        if self._pendientes:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._pendientes = 0
+        self._ultima_sincronizacion = time.monotonic()
+    
+    def truncar(self):
+        """Vacía el diario (tras guardar una instantánea)."""
+        self.sincronizar()
+        self._f.truncate(0)
+        self._f.seek(0)
+        os.fsync(self._f.fileno())
+    
+    def cerrar(self):
+        """Sincroniza y cierra el archivo."""
+        if not self._f.closed:
+            self.sincronizar()
+            self._f.close()
+    
+    @staticmethod
+    def leer(archivo):
+        """
+        Recorre el diario en orden y genera (secuencia, operacion, args).
+        
+        Una última línea incompleta o corrupta (escritura interrumpida) se
+        elimina del archivo y termina la lectura. Una línea corrupta seguida
+        de otras no puede venir de una escritura interrumpida: se lanza
+        ValueError y el archivo no se modifica.
+        """
+        if not os.path.exists(archivo):
+            return
+        with open(archivo, 'rb+') as f:
+            posicion = 0
+            for numero, linea in enumerate(f, 1):
+                try:
+                    if not linea.endswith(b'\n'):
+                        raise ValueError("Línea incompleta.")
+                    secuencia, operacion, args = json.loads(linea)
+                except ValueError:
+                    if f.read(1):
+                        raise ValueError(f"Diario '{archivo}' corrupto en la línea {numero} "
+                                         f"(byte {posicion}), antes del final.") from None
+                    f.truncate(posicion)
+                    return
+                posicion += len(linea)
+                yield secuencia, operacion, args
+
+
+def _sincronizar_directorio(archivo):
+    """Sincroniza a disco el directorio de un archivo (hace durable un renombrado)."""
+    if os.name == 'nt':
+        # Windows no permite abrir un directorio para sincronizarlo.
+        return
+    descriptor = os.open(os.path.dirname(os.path.abspath(archivo)), os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class _CerrojosEstriados:
+    """
+    Conjunto fijo de cerrojos repartidos por hash de la clave.
+    
+    Claves distintas casi siempre caen en cerrojos distintos, así que las
+    operaciones sobre libros o usuarios diferentes no se bloquean entre sí.
+    """
+    
+    def __init__(self, cantidad=64):
+        self._cerrojos = [threading.Lock() for _ in range(cantidad)]
+    
+    def de(self, clave):
+        return self._cerrojos[hash(clave) % len(self._cerrojos)]
+
+
+def _sincronizado(metodo):
+    """Ejecuta el método con el cerrojo de índices del sistema tomado."""
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._cerrojo_indices:
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+
+def _memorizado(metodo):
+    """
+    Guarda el resultado del método por argumentos en la caché de consultas
+    del sistema. Un resultado sirve mientras no cambie la generación del
+    sistema, que avanza con cada mutación que afecta a los reportes.
+    
+    Se retorna una copia superficial, para que el llamador pueda modificar
+    la lista o el dict sin alterar la caché.
+    """
+    nombre = metodo.__name__
+    
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        cache = self._cache_consultas
+        if self._tamano_cache <= 0:
+            return metodo(self, *args, **kwargs)
+        
+        clave = (nombre, args, tuple(kwargs.items()))
+        entrada = cache.get(clave)
+        acierto = entrada is not None and entrada[0] == self._generacion
+        if self._metricas is not None:
+            self._metricas.registrar_acierto('cache_consultas', acierto)
+        
+        if acierto:
+            cache.move_to_end(clave)
+            resultado = entrada[1]
+        else:
+            resultado = metodo(self, *args, **kwargs)
+            cache[clave] = (self._generacion, resultado)
+            cache.move_to_end(clave)
+            if len(cache) > self._tamano_cache:
+                cache.popitem(last=False)
+        return resultado.copy()
+    return envoltura
+
+
+_SEPARADORES = re.compile(r'[\W_]+')
+
+# Libros a partir de los cuales las palabras frecuentes de una consulta difusa
+# ya no agregan candidatos nuevos (ver buscar_libros_difuso)
+_MAX_CANDIDATOS_DIFUSOS = 20000
+
+
+def _plegar_texto(texto):
+    """Minúsculas y sin acentos: 'García Márquez' -> 'garcia marquez'."""
+    texto = texto.casefold()
+    if not texto.isascii():
+        texto = ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+    return texto
+
+
+def _palabras_plegadas(texto):
+    """Palabras del texto plegado, sin signos de puntuación."""
+    return [palabra for palabra in _SEPARADORES.split(_plegar_texto(texto)) if palabra]
+
+
+def _trigramas_palabra(palabra):
+    """Trigramas de una palabra con un espacio a cada lado: 'sol' -> ' so', 'sol', 'ol '."""
+    palabra = f" {palabra} "
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+# ===========================================================================
+# INSTRUMENTACIÓN
+# ===========================================================================
+
+# Métodos públicos que se cronometran al activar las métricas
+_METODOS_INSTRUMENTADOS = (
+    'agregar_libro', 'actualizar_copias', 'buscar_libros', 'buscar_libros_difuso', 'buscar_por_rango_anios',
+    'registrar_usuario', 'obtener_estado_usuario', 'prestar_libro', 'devolver_libro', 'renovar_prestamo',
+    'pagar_multa', 'prestar_lote', 'devolver_lote', 'reservar_libro', 'cancelar_reserva', 'libros_mas_prestados', 'usuarios_mas_activos',
+    'estadisticas_categoria', 'prestamos_vencidos', 'reporte_financiero', 'exportar_catalogo',
+    'importar_catalogo', 'guardar_estado'
+)
+
+# Límites superiores (segundos) de los intervalos del histograma de latencia
+_LIMITES_LATENCIA = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class MetricasBiblioteca:
+    """
+    Métricas de uso de un SistemaBiblioteca.
+    
+    Por método: llamadas, histograma de latencias y excepciones por tipo.
+    Además, aciertos y fallos de índices y cachés (p. ej. 'indice_texto':
+    consultas resueltas con trigramas frente a recorridos completos).
+    """
+    
+    def __init__(self, concurrente=False):
+        self._cerrojo = threading.Lock() if concurrente else nullcontext()
+        self.llamadas = Counter()
+        self.errores = Counter()
+        self.latencias = defaultdict(lambda: [0] * (len(_LIMITES_LATENCIA) + 1))
+        self.segundos = defaultdict(float)
+        self.aciertos = Counter()
+        self.fallos = Counter()
+    
+    def envolver(self, nombre, metodo):
+        """Retorna metodo envuelto para registrar sus llamadas, latencia y errores."""
+        @wraps(metodo)
+        def instrumentado(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return metodo(*args, **kwargs)
+            except Exception as e:
+                with self._cerrojo:
+                    self.errores[nombre, type(e).__name__] += 1
+                raise
+            finally:
+                self.registrar_llamada(nombre, time.perf_counter() - inicio)
+        return instrumentado
+    
+    def registrar_llamada(self, nombre, segundos):
+        intervalo = bisect.bisect_left(_LIMITES_LATENCIA, segundos)
+        with self._cerrojo:
+            self.llamadas[nombre] += 1
+            self.latencias[nombre][intervalo] += 1
+            self.segundos[nombre] += segundos
+    
+    def registrar_acierto(self, indice, acierto):
+        with self._cerrojo:
+            if acierto:
+                self.aciertos[indice] += 1
+            else:
+                self.fallos[indice] += 1
+    
+    def instantanea(self):
+        """Copia de las métricas como dict (apto para JSON)."""
+        with self._cerrojo:
+            metodos = {}
+            for nombre, cantidad in self.llamadas.items():
+                intervalos = self.latencias[nombre]
+                metodos[nombre] = {
+                    'llamadas': cantidad,
+                    'segundos_total': self.segundos[nombre],
+                    'latencia_promedio': self.segundos[nombre] / cantidad,
+                    'histograma': {str(limite): n for limite, n in zip(_LIMITES_LATENCIA + ('+Inf',), intervalos)},
+                    'errores': {tipo: n for (metodo, tipo), n in self.errores.items() if metodo == nombre}
+                }
+            indices = {}
+            for indice in self.aciertos.keys() | self.fallos.keys():
+                aciertos, fallos = self.aciertos[indice], self.fallos[indice]
+                indices[indice] = {'aciertos': aciertos, 'fallos': fallos,
+                                   'tasa_aciertos': aciertos / (aciertos + fallos)}
+            return {'metodos': metodos, 'indices': indices}
+    
+    def texto_prometheus(self, prefijo='biblioteca'):
+        """Métricas en el formato de texto de exposición de Prometheus."""
+        with self._cerrojo:
+            lineas = [
+                f"# HELP {prefijo}_llamadas_total Llamadas por método.",
+                f"# TYPE {prefijo}_llamadas_total counter"
+            ]
+            lineas += [f'{prefijo}_llamadas_total{{metodo="{nombre}"}} {n}' for nombre, n in sorted(self.llamadas.items())]
+            
+            lineas += [
+                f"# HELP {prefijo}_latencia_segundos Latencia por método.",
+                f"# TYPE {prefijo}_latencia_segundos histogram"
+            ]
+            for nombre in sorted(self.llamadas):
+                acumulado = 0
+                for limite, n in zip(_LIMITES_LATENCIA + ('+Inf',), self.latencias[nombre]):
+                    acumulado += n
+                    lineas.append(f'{prefijo}_latencia_segundos_bucket{{metodo="{nombre}",le="{limite}"}} {acumulado}')
+                lineas.append(f'{prefijo}_latencia_segundos_sum{{metodo="{nombre}"}} {self.segundos[nombre]}')
+                lineas.append(f'{prefijo}_latencia_segundos_count{{metodo="{nombre}"}} {self.llamadas[nombre]}')
+            
+            lineas += [
+                f"# HELP {prefijo}_errores_total Excepciones lanzadas por método y tipo.",
+                f"# TYPE {prefijo}_errores_total counter"
+            ]
+            lineas += [f'{prefijo}_errores_total{{metodo="{nombre}",tipo="{tipo}"}} {n}'
+                       for (nombre, tipo), n in sorted(self.errores.items())]
+            
+            lineas += [
+                f"# HELP {prefijo}_indice_consultas_total Consultas a índices y cachés por resultado.",
+                f"# TYPE {prefijo}_indice_consultas_total counter"
+            ]
+            for indice in sorted(self.aciertos.keys() | self.fallos.keys()):
+                lineas.append(f'{prefijo}_indice_consultas_total{{indice="{indice}",resultado="acierto"}} {self.aciertos[indice]}')
+                lineas.append(f'{prefijo}_indice_consultas_total{{indice="{indice}",resultado="fallo"}} {self.fallos[indice]}')
+            return '\n'.join(lineas) + '\n'
+
+
+# ===========================================================================
+# VALIDACIÓN Y PARSEO DE LIBROS
+# ===========================================================================
+
+def _validar_libro(isbn, titulo, autor, anio, copias, anio_max):
+    """
+    Valida los datos de un libro y retorna el año como entero.
+    
+    anio_max se recibe precalculado para no consultar la fecha por libro.
+    """
+    if not (isinstance(isbn, str) and len(isbn) == 13 and isbn.isdigit()):
+        raise ValueError("ISBN debe ser un string de 13 dígitos.")
+    if not titulo or not autor:
+        raise ValueError("Título y autor no pueden estar vacíos.")
+    try:
+        anio_int = int(anio)
+        if not (1000 <= anio_int <= anio_max):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise ValueError(f"Año debe ser un número entre 1000 y {anio_max}.")
+    if not isinstance(copias, int) or copias < 1:
+        raise ValueError("El número de copias debe ser un entero positivo (>= 1).")
+    return anio_int
+
+
+def _parsear_bloque(lineas, anio_max):
+    """
+    Parsea y valida un bloque de líneas 'ISBN|Título|Autor|Año|Categoría|Copias'.
+    
+    Args:
+        lineas: Lista de tuplas (num_linea, linea)
+        anio_max: Año máximo permitido
+    
+    Returns:
+        tuple: (libros, errores) con libros = [(num_linea, isbn, titulo, autor,
+               anio, categoria, copias)] y errores = [(num_linea, mensaje)]
+    """
+    libros = []
+    errores = []
+    for num_linea, linea in lineas:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            partes = linea.split('|')
+            if len(partes) != 6:
+                raise ValueError("Número incorrecto de campos.")
+            
+            isbn, titulo, autor, anio_str, categoria, copias_str = partes
+            copias = int(copias_str)
+            anio = _validar_libro(isbn, titulo, autor, int(anio_str), copias, anio_max)
+            libros.append((num_linea, isbn, titulo, autor, anio, categoria, copias))
+        except Exception as e:
+            errores.append((num_linea, f"Error de formato/validación: {e}"))
+    return libros, errores
+
+
+# ===========================================================================
+# EXPORTACIÓN DEL CATÁLOGO
+# ===========================================================================
+
+# Compresión: nombre -> (función de apertura, extensión, opciones)
+_COMPRESORES = {
+    'gzip': (gzip.open, '.gz', {'compresslevel': 6}),
+    'bz2': (bz2.open, '.bz2', {}),
+    'xz': (lzma.open, '.xz', {})
+}
+
+_COLUMNAS_CATALOGO = ('isbn', 'titulo', 'autor', 'anio', 'categoria', 'copias')
+
+
+def _nombres_particiones(archivo, comprimir, particiones):
+    """
+    Nombres de los archivos de una exportación: el indicado si es una sola
+    parte, o 'catalogo-001-de-004.txt.gz' y similares si son varias.
+    """
+    if particiones == 1:
+        return [archivo]
+    sufijo = _COMPRESORES[comprimir][1] if comprimir else ''
+    base = archivo[:-len(sufijo)] if sufijo and archivo.endswith(sufijo) else archivo
+    raiz, extension = os.path.splitext(base)
+    return [f"{raiz}-{i:03d}-de-{particiones:03d}{extension}{sufijo}" for i in range(1, particiones + 1)]
+
+
+def _escribir_particion(archivo, isbns, libros, formato, comprimir, tamano_bloque, cabecera=True):
+    """
+    Escribe en un archivo los libros de dos listas paralelas de ISBN y Libro.
+    En csv/tsv, cabecera indica si se escribe la fila de nombres de columna.
+    
+    Las líneas se arman por bloques de tamano_bloque libros y cada bloque se
+    escribe con una sola llamada; la compresión (zlib, bz2, lzma) libera el
+    GIL, de modo que varias particiones se comprimen en paralelo.
+    """
+    # El módulo csv requiere newline=''; el formato pipe usa el salto de línea del sistema.
+    salto = None if formato == 'pipe' else ''
+    if comprimir is None:
+        salida = open(archivo, 'w', encoding='utf-8', newline=salto)
+    else:
+        abrir, _, opciones = _COMPRESORES[comprimir]
+        salida = abrir(archivo, 'wt', encoding='utf-8', newline=salto, **opciones)
+    
+    # zip reutiliza su tupla al desempacarla: no se crea un objeto por libro
+    # que sobreviva al bloque (lo que dispararía recolecciones completas del GC).
+    filas = zip(isbns, libros)
+    with salida as f:
+        if formato == 'pipe':
+            for _ in range(0, len(libros), tamano_bloque):
+                f.write(''.join([
+                    f"{isbn}|{info.titulo}|{info.autor}|{info.anio}|{info.categoria}|{info.copias_total}\n"
+                    for isbn, info in islice(filas, tamano_bloque)
+                ]))
+        else:
+            # csv escapa comillas, separadores y saltos de línea en los campos
+            bloque = io.StringIO()
+            escritor = csv.writer(bloque, delimiter=',' if formato == 'csv' else '\t', lineterminator='\n')
+            if cabecera:
+                escritor.writerow(_COLUMNAS_CATALOGO)
+            for _ in range(0, len(libros), tamano_bloque):
+                escritor.writerows((isbn, info.titulo, info.autor, info.anio, info.categoria, info.copias_total)
+                                   for isbn, info in islice(filas, tamano_bloque))
+                f.write(bloque.getvalue())
+                bloque.seek(0)
+                bloque.truncate()
+            if not libros:
+                f.write(bloque.getvalue())
+    return len(libros)
+
+
 # ===========================================================================
 # CLASE PRINCIPAL: SISTEMA BIBLIOTECA (35 puntos)
 # ===========================================================================
@@ -68,50 +858,326 @@ class SistemaBiblioteca:
     - catalogo: {isbn: {'titulo', 'autor', 'anio', 'categoria', 'copias_total', 'copias_disponibles'}}
     - usuarios: {id_usuario: {'nombre', 'email', 'fecha_registro', 'prestamos_activos', 'historial'}}
     - prestamos: {id_prestamo: {'isbn', 'id_usuario', 'fecha_prestamo', 'fecha_vencimiento', 'fecha_devolucion', 'multa', 'pagada'}}
+    - reservas: {id_reserva: {'isbn', 'id_usuario', 'fecha_reserva', 'estado', 'fecha_limite'}}
+    
+    Los valores son registros Libro, Usuario, Prestamo y Reserva (con __slots__), que
+    admiten el mismo acceso por clave que un dict. Las fechas de los préstamos
+    se guardan como objetos date; solo se convierten a texto al generar
+    mensajes o reportes.
     """
     
-    def __init__(self, dias_prestamo=14, multa_por_dia=1.0, limite_prestamos=3):
+    def __init__(self, dias_prestamo=14, multa_por_dia=1.0, limite_prestamos=3, concurrente=False,
+                 dias_reserva=3, tamano_cache=256):
         """
         Inicializa el sistema.
+        
+        tamano_cache es el número de resultados de libros_mas_prestados,
+        usuarios_mas_activos y estadisticas_categoria que se conservan
+        (LRU) mientras no haya mutaciones; 0 desactiva la caché.
+        
+        dias_reserva es el plazo para retirar un libro reservado desde que
+        se le asigna una copia; al vencer, la copia pasa a la siguiente reserva.
+        
+        Con concurrente=True el sistema puede usarse desde varios hilos:
+        cada préstamo, devolución, renovación o pago valida y actúa con los
+        cerrojos de su usuario y de su libro tomados (siempre en ese orden),
+        y las estructuras compartidas (registros, índices, contadores,
+        diario) se modifican bajo un cerrojo común que solo se retiene lo
+        que dura la actualización.
         """
         self.DIAS_PRESTAMO = dias_prestamo
         self.MULTA_POR_DIA = multa_por_dia
         self.LIMITE_PRESTAMOS = limite_prestamos
+        self.DIAS_RESERVA = dias_reserva
+        self._tamano_cache = tamano_cache
         
         self.catalogo = {}
         self.usuarios = {}
         self.prestamos = {}
+        self.reservas = {}
         self._next_prestamo_id = 1
+        self._next_reserva_id = 1
+        
+        # Funciones a las que se avisa cada evento de reserva (ver suscribir_notificaciones)
+        self._suscriptores = []
+        
+        # Diario de operaciones (ver activar_diario) y número de la última operación anotada
+        self._diario = None
+        self._secuencia_diario = 0
+        
+        # Métricas de uso (ver activar_metricas); sin costo mientras están desactivadas
+        self._metricas = None
+        
+        if concurrente:
+            self._cerrojos_usuario = _CerrojosEstriados()
+            self._cerrojos_libro = _CerrojosEstriados()
+            self._cerrojo_indices = threading.RLock()
+            self._cerrojo_ids = threading.Lock()
+        else:
+            self._cerrojos_usuario = self._cerrojos_libro = None
+            self._cerrojo_indices = self._cerrojo_ids = nullcontext()
+        
+        self._inicializar_indices()
     
+    def _inicializar_indices(self):
+        """Crea vacías las estructuras derivadas de catalogo, usuarios y prestamos."""
+        # Índice invertido de trigramas: {campo: {trigrama: set(isbn)}}
+        self._indice_texto = {'titulo': defaultdict(set), 'autor': defaultdict(set)}
+        self._texto_normalizado = {}
+        self._posicion_libro = {}
+        self._siguiente_posicion = 0
+        # ISBN importados cuyo texto se indexa al hacer la siguiente búsqueda
+        self._texto_pendiente = []
+        
+        # Búsqueda difusa, sobre palabras plegadas (sin acentos ni mayúsculas):
+        # {campo: {palabra: set(isbn)}}, {campo: {isbn: cantidad de palabras}},
+        # vocabulario {palabra: cantidad de trigramas} y {trigrama: set(palabra)}
+        self._palabras_difusas = {'titulo': {}, 'autor': {}}
+        self._tamano_difuso = {'titulo': {}, 'autor': {}}
+        self._vocabulario_difuso = {}
+        self._trigramas_vocabulario = defaultdict(set)
+        self._difuso_pendiente = []
+        
+        # Índices secundarios: {categoria_normalizada: {isbn: None}}, {anio: {isbn: None}}
+        self._indice_categoria = defaultdict(dict)
+        self._indice_anio = defaultdict(dict)
+        self._anios_ordenados = []
+        
+        # Contadores incrementales de préstamos históricos por ISBN
+        self._conteo_prestamos_libro = Counter()
+        
+        # Montículo de préstamos activos: [(fecha_vencimiento, id_prestamo)].
+        # Las entradas de préstamos devueltos o renovados se descartan al extraerlas.
+        self._heap_vencimientos = []
+        
+        # Saldo de multas de préstamos devueltos y no pagados: {id_usuario: monto}
+        self._saldo_multas = defaultdict(float)
+        
+        # Multas por día de devolución, montos en centavos:
+        # [monto, devoluciones, con_multa, pagadas, pendientes]
+        self._multas_por_dia = _FenwickDiario(5)
+        
+        # Colas de reservas en espera: {isbn: deque(id_reserva)}. Las reservas
+        # canceladas se descartan al llegar a la cabeza de la cola.
+        self._colas_reserva = defaultdict(deque)
+        # Reserva en espera o asignada de cada par: {(isbn, id_usuario): id_reserva}
+        self._reserva_activa = {}
+        # Plazos de retiro de las reservas asignadas, por día
+        self._rueda_reservas = _RuedaTemporal(date.today().toordinal() - 1)
+        # Eventos de reserva aún no leídos: {id_usuario: deque(evento)}
+        self._avisos = defaultdict(partial(deque, maxlen=100))
+        
+        # Caché LRU de reportes: {(método, args, kwargs): (generación, resultado)}.
+        # La generación avanza con cada libro, usuario, cambio de copias,
+        # préstamo, devolución o reserva liberada; las entradas de
+        # generaciones anteriores se recalculan al pedirlas.
+        self._cache_consultas = OrderedDict()
+        self._generacion = 0
+    
+    @contextmanager
+    def _bloqueo(self, id_usuario=None, isbn=None):
+        """Toma los cerrojos del usuario y del libro indicados (modo concurrente)."""
+        if self._cerrojos_usuario is None:
+            yield
+            return
+        with self._cerrojos_usuario.de(id_usuario) if id_usuario is not None else nullcontext(), \
+                self._cerrojos_libro.de(isbn) if isbn is not None else nullcontext():
+            yield
     
+    @_sincronizado
     def agregar_libro(self, isbn, titulo, autor, anio, categoria, copias):
         """
         Agrega un libro al catálogo.
         """
-        if not (isinstance(isbn, str) and len(isbn) == 13 and isbn.isdigit()):
-            raise ValueError("ISBN debe ser un string de 13 dígitos.")
-        if not titulo or not autor:
-            raise ValueError("Título y autor no pueden estar vacíos.")
-        try:
-            anio_int = int(anio)
-            if not (1000 <= anio_int <= datetime.now().year):
-                raise ValueError
-        except (ValueError, TypeError):
-            raise ValueError(f"Año debe ser un número entre 1000 y {datetime.now().year}.")
-        if not isinstance(copias, int) or copias < 1:
-            raise ValueError("El número de copias debe ser un entero positivo (>= 1).")
+        anio_int = _validar_libro(isbn, titulo, autor, anio, copias, date.today().year)
         
         if isbn in self.catalogo:
             raise KeyError(f"Libro con ISBN {isbn} ya existe.")
         
-        self.catalogo[isbn] = {
-            'titulo': titulo,
-            'autor': autor,
-            'anio': anio_int,
-            'categoria': categoria,
-            'copias_total': copias,
-            'copias_disponibles': copias
-        }
+        self._insertar_libro(isbn, titulo, autor, anio_int, categoria, copias)
+    
+    @_sincronizado
+    def _insertar_libro(self, isbn, titulo, autor, anio, categoria, copias, diferir_texto=False):
+        """
+        Inserta un libro ya validado y lo agrega a los índices.
+        
+        Con diferir_texto=True la indexación por trigramas se pospone hasta
+        la siguiente búsqueda de texto (útil en importaciones masivas).
+        """
+        self.catalogo[isbn] = Libro(titulo, autor, anio, categoria, copias, copias)
+        self._generacion += 1
+        self._indexar_libro(isbn, diferir_texto)
+        self._anotar('libro', isbn, titulo, autor, anio, categoria, copias)
+    
+    # -----------------------------------------------------------------------
+    # Índices del catálogo (texto, categoría y año)
+    # -----------------------------------------------------------------------
+    
+    def _reconstruir_indices(self):
+        """
+        Reconstruye todas las estructuras derivadas a partir de catalogo,
+        usuarios y prestamos (por ejemplo, tras cargar una instantánea).
+        """
+        self._inicializar_indices()
+        
+        for isbn in self.catalogo:
+            self._indexar_libro(isbn, diferir_texto=True)
+        
+        self._indexar_reservas()
+        
+        conteo = defaultdict(int)
+        activos = self._heap_vencimientos
+        saldo = self._saldo_multas
+        por_fecha = {}
+        for id_prestamo, prestamo in self.prestamos.items():
+            conteo[prestamo.isbn] += 1
+            fecha_devolucion = prestamo.fecha_devolucion
+            if fecha_devolucion is None:
+                activos.append((prestamo.fecha_vencimiento, id_prestamo))
+                continue
+            
+            multa = prestamo.multa
+            valores = por_fecha.get(fecha_devolucion)
+            if valores is None:
+                valores = por_fecha[fecha_devolucion] = [0, 0, 0, 0, 0]
+            valores[1] += 1
+            if multa > 0:
+                centavos = _centavos(multa)
+                valores[0] += centavos
+                valores[2] += 1
+                if prestamo.pagada:
+                    valores[3] += centavos
+                else:
+                    valores[4] += centavos
+                    saldo[prestamo.id_usuario] += multa
+        
+        self._conteo_prestamos_libro.update(conteo)
+        heapq.heapify(activos)
+        self._multas_por_dia.cargar_dias({fecha.toordinal(): valores for fecha, valores in por_fecha.items()})
+    
+    @staticmethod
+    def _trigramas(texto):
+        """Retorna el conjunto de trigramas de un texto ya normalizado."""
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+    
+    def _indexar_libro(self, isbn, diferir_texto=False):
+        """Agrega un libro a los índices de texto, categoría y año."""
+        info = self.catalogo[isbn]
+        self._posicion_libro[isbn] = self._siguiente_posicion
+        self._siguiente_posicion += 1
+        
+        if diferir_texto:
+            self._texto_pendiente.append(isbn)
+            self._difuso_pendiente.append(isbn)
+        else:
+            self._indexar_texto(isbn)
+            self._indexar_difuso(isbn)
+        
+        self._indice_categoria[info.categoria.lower()][isbn] = None
+        
+        anio = info.anio
+        if anio not in self._indice_anio:
+            bisect.insort(self._anios_ordenados, anio)
+        self._indice_anio[anio][isbn] = None
+    
+    def _indexar_texto(self, isbn):
+        """Agrega el título y autor de un libro al índice de trigramas."""
+        info = self.catalogo[isbn]
+        normalizado = {'titulo': info.titulo.lower(), 'autor': info.autor.lower()}
+        self._texto_normalizado[isbn] = normalizado
+        
+        for campo, texto in normalizado.items():
+            indice = self._indice_texto[campo]
+            for trigrama in self._trigramas(texto):
+                indice[trigrama].add(isbn)
+    
+    def _completar_indice_texto(self):
+        """Indexa los libros cuya indexación de texto quedó pendiente."""
+        if self._texto_pendiente:
+            pendientes, self._texto_pendiente = self._texto_pendiente, []
+            for isbn in pendientes:
+                self._indexar_texto(isbn)
+    
+    def _indexar_difuso(self, isbn):
+        """Agrega el título y autor de un libro al índice de búsqueda difusa."""
+        info = self.catalogo[isbn]
+        vocabulario = self._vocabulario_difuso
+        for campo, texto in (('titulo', info.titulo), ('autor', info.autor)):
+            palabras = set(_palabras_plegadas(texto))
+            self._tamano_difuso[campo][isbn] = len(palabras)
+            indice = self._palabras_difusas[campo]
+            for palabra in palabras:
+                isbns = indice.get(palabra)
+                if isbns is None:
+                    isbns = indice[palabra] = set()
+                    if palabra not in vocabulario:
+                        trigramas = _trigramas_palabra(palabra)
+                        vocabulario[palabra] = len(trigramas)
+                        for trigrama in trigramas:
+                            self._trigramas_vocabulario[trigrama].add(palabra)
+                isbns.add(isbn)
+    
+    def _palabras_similares(self, palabra, similitud_minima):
+        """{palabra del vocabulario: similitud de Dice de sus trigramas con palabra}."""
+        trigramas = _trigramas_palabra(palabra)
+        comunes = Counter()
+        for trigrama in trigramas:
+            comunes.update(self._trigramas_vocabulario.get(trigrama, ()))
+        
+        similares = {}
+        for candidata, cantidad in comunes.items():
+            similitud = 2 * cantidad / (len(trigramas) + self._vocabulario_difuso[candidata])
+            if similitud >= similitud_minima:
+                similares[candidata] = similitud
+        return similares
+    
+    def _completar_indice_difuso(self):
+        """Indexa los libros cuya indexación difusa quedó pendiente."""
+        if self._difuso_pendiente:
+            pendientes, self._difuso_pendiente = self._difuso_pendiente, []
+            for isbn in pendientes:
+                self._indexar_difuso(isbn)
+    
+    def _candidatos_texto(self, campo, valor_lower):
+        """
+        Retorna un iterador de los ISBN cuyo campo contiene valor_lower, en
+        orden de inserción.
+        
+        Consultas de 3 o más caracteres se resuelven intersectando las listas
+        de trigramas; las más cortas recorren el texto normalizado a medida
+        que se consume el iterador.
+        """
+        self._completar_indice_texto()
+        
+        if self._metricas is not None:
+            self._metricas.registrar_acierto('indice_texto', len(valor_lower) >= 3)
+        
+        if len(valor_lower) < 3:
+            # Se recorre el catálogo (orden de inserción): _texto_normalizado
+            # está en orden de indexación, que difiere tras una importación.
+            texto_normalizado = self._texto_normalizado
+            return (isbn for isbn in self.catalogo if valor_lower in texto_normalizado[isbn][campo])
+        
+        indice = self._indice_texto[campo]
+        listas = []
+        for trigrama in self._trigramas(valor_lower):
+            isbns = indice.get(trigrama)
+            if not isbns:
+                return []
+            listas.append(isbns)
+        listas.sort(key=len)
+        
+        candidatos = set(listas[0])
+        for isbns in listas[1:]:
+            candidatos &= isbns
+            if not candidatos:
+                return []
+        
+        # Los trigramas no garantizan contigüidad: la subcadena se verifica
+        # al consumir el iterador, ya en orden de inserción.
+        candidatos = sorted(candidatos, key=self._posicion_libro.__getitem__)
+        texto_normalizado = self._texto_normalizado
+        return (isbn for isbn in candidatos if valor_lower in texto_normalizado[isbn][campo])
     
     def actualizar_copias(self, isbn, cantidad_cambio):
         """
@@ -122,40 +1188,189 @@ class SistemaBiblioteca:
             
         libro = self.catalogo[isbn]
         
-        nueva_total = libro['copias_total'] + cantidad_cambio
-        nueva_disponible = libro['copias_disponibles'] + cantidad_cambio
-        
-        if nueva_total < 0 or nueva_disponible < 0:
-            raise ValueError("El resultado de la operación resultaría en copias negativas.")
+        with self._bloqueo(isbn=isbn):
+            nueva_total = libro.copias_total + cantidad_cambio
+            nueva_disponible = libro.copias_disponibles + cantidad_cambio
             
-        libro['copias_total'] = nueva_total
-        libro['copias_disponibles'] = nueva_disponible
+            if nueva_total < 0 or nueva_disponible < 0:
+                raise ValueError("El resultado de la operación resultaría en copias negativas.")
+                
+            self._registrar_cambio_copias(isbn, cantidad_cambio)
+    
+    @_sincronizado
+    def _registrar_cambio_copias(self, isbn, cantidad_cambio, fecha=None):
+        """Aplica un cambio de copias ya validado; las copias nuevas atienden primero las reservas."""
+        fecha = fecha or date.today()
+        libro = self.catalogo[isbn]
+        libro.copias_total += cantidad_cambio
+        libro.copias_disponibles += cantidad_cambio
+        self._generacion += 1
+        self._anotar('copias', isbn, cantidad_cambio, fecha.toordinal())
+        if cantidad_cambio > 0:
+            self._asignar_reservas(isbn, fecha)
     
+    @_sincronizado
     def buscar_libros(self, criterio='titulo', valor='', categoria=None):
         """
         Busca libros por diferentes criterios.
         """
-        resultados = []
+        return [{'isbn': isbn, **self.catalogo[isbn]} for isbn in self._isbns_busqueda(criterio, valor, categoria)]
+    
+    def iterar_libros(self, criterio='titulo', valor='', categoria=None, offset=0, limite=None):
+        """
+        Versión perezosa y paginada de buscar_libros.
+        
+        Genera VistaLibro (sin copiar los datos del libro) a medida que se
+        consume, en el mismo orden estable que buscar_libros, saltando los
+        primeros `offset` resultados y deteniéndose tras `limite`.
+        
+        En modo concurrente los ISBN que coinciden se fijan al iniciar la
+        iteración; en otro caso no se debe modificar el catálogo mientras se
+        consume el generador.
+        """
+        if self._cerrojos_usuario is None:
+            isbns = self._isbns_busqueda(criterio, valor, categoria)
+        else:
+            with self._cerrojo_indices:
+                isbns = list(self._isbns_busqueda(criterio, valor, categoria))
+        
+        catalogo = self.catalogo
+        fin = None if limite is None else offset + limite
+        for isbn in islice(isbns, offset, fin):
+            yield VistaLibro(isbn, catalogo[isbn])
+    
+    def _isbns_busqueda(self, criterio, valor, categoria):
+        """Iterador de los ISBN que cumplen una búsqueda, en orden de inserción."""
         valor_lower = str(valor).lower()
+        en_categoria = None
+        if categoria is not None:
+            en_categoria = self._indice_categoria.get(categoria.lower(), {})
         
-        for isbn, info in self.catalogo.items():
-            coincide_criterio = False
+        if criterio in ('titulo', 'autor'):
+            if not valor_lower and en_categoria is not None:
+                isbns = en_categoria
+            else:
+                isbns = self._candidatos_texto(criterio, valor_lower)
+        elif criterio == 'anio':
+            # Se conserva la comparación textual original ('0195' no es 195).
+            if valor_lower.isdigit() and str(int(valor_lower)) == valor_lower:
+                isbns = self._indice_anio.get(int(valor_lower), {})
+            else:
+                isbns = []
+        else:
+            isbns = []
+        
+        if en_categoria is None or isbns is en_categoria:
+            return iter(isbns)
+        return (isbn for isbn in isbns if isbn in en_categoria)
+    
+    @_sincronizado
+    def buscar_libros_difuso(self, consulta, limite=10, campo=None, similitud_minima=0.4):
+        """
+        Búsqueda tolerante a errores de escritura y a acentos, ordenada por relevancia.
+        
+        Cada palabra de la consulta se empareja con las palabras del catálogo
+        cuyos trigramas se parecen (coeficiente de Dice >= similitud_minima),
+        p. ej. 'marques' con 'márquez'. La relevancia de un libro combina la
+        similitud de cada palabra de la consulta con su mejor pareja en el
+        libro, penalizando los textos con muchas palabras de más.
+        
+        Las palabras de la consulta se procesan de la menos a la más
+        frecuente; las muy frecuentes (como 'de' o 'la') solo suman puntaje
+        a los libros ya hallados por las demás.
+        
+        Args:
+            consulta: Texto buscado (p. ej. 'garcia marques')
+            limite: Máximo de resultados
+            campo: 'titulo', 'autor' o None para ambos (cuenta el mejor)
+        
+        Returns:
+            list: Dicts del libro con 'isbn' y 'relevancia' (0 a 1), de mayor
+                  a menor relevancia y, a igual relevancia, en orden de alta.
+        """
+        self._completar_indice_difuso()
+        palabras = list(dict.fromkeys(_palabras_plegadas(consulta)))
+        if not palabras or limite <= 0:
+            return []
+        similares = [sorted(self._palabras_similares(p, similitud_minima).items(), key=itemgetter(1))
+                     for p in palabras]
+        maximo_candidatos = max(_MAX_CANDIDATOS_DIFUSOS, limite)
+        
+        relevancia = {}
+        for nombre in ((campo,) if campo else ('titulo', 'autor')):
+            indice = self._palabras_difusas[nombre]
+            tamanos = self._tamano_difuso[nombre]
             
-            if criterio == 'titulo' and valor_lower in info['titulo'].lower():
-                coincide_criterio = True
-            elif criterio == 'autor' and valor_lower in info['autor'].lower():
-                coincide_criterio = True
-            elif criterio == 'anio' and str(info['anio']) == valor_lower:
-                coincide_criterio = True
+            # [(postings de cada pareja, similitud)] por palabra, de la menos frecuente a la más
+            listas = []
+            for parejas in similares:
+                postings = [(indice[v], s) for v, s in parejas if v in indice]
+                listas.append((sum(len(isbns) for isbns, _ in postings), postings))
+            listas.sort(key=itemgetter(0))
             
-            if coincide_criterio:
-                if categoria is None or info['categoria'].lower() == categoria.lower():
-                    resultados.append({'isbn': isbn, **info})
-                    
+            totales = {}
+            cantidad = 0
+            for tamano, postings in listas:
+                generadora = cantidad == 0 or cantidad + tamano <= maximo_candidatos
+                cantidad += tamano if generadora else 0
+                mejor = {}
+                # En orden de similitud creciente, así queda la mejor pareja de cada libro.
+                for isbns, similitud in postings:
+                    if not generadora:
+                        isbns = totales.keys() & isbns
+                    mejor.update(dict.fromkeys(isbns, similitud))
+                if not totales:
+                    totales = mejor
+                    continue
+                for isbn, similitud in mejor.items():
+                    totales[isbn] = totales.get(isbn, 0.0) + similitud
+            
+            n = len(palabras)
+            puntajes = {isbn: 2 * total / (n + tamanos[isbn]) for isbn, total in totales.items()}
+            if not relevancia:
+                relevancia = puntajes
+                continue
+            for isbn, puntaje in puntajes.items():
+                if puntaje > relevancia.get(isbn, 0.0):
+                    relevancia[isbn] = puntaje
+        
+        # Se ordenan solo los que alcanzan el puntaje del último de los `limite` mejores.
+        if len(relevancia) > limite:
+            umbral = heapq.nlargest(limite, relevancia.values())[-1]
+            elegidos = [par for par in relevancia.items() if par[1] >= umbral]
+        else:
+            elegidos = list(relevancia.items())
+        posicion = self._posicion_libro
+        elegidos.sort(key=lambda par: (-par[1], posicion[par[0]]))
+        mejores = elegidos[:limite]
+        return [{'isbn': isbn, **self.catalogo[isbn], 'relevancia': round(min(puntaje, 1.0), 3)}
+                for isbn, puntaje in mejores]
+    
+    @_sincronizado
+    def buscar_por_rango_anios(self, anio_inicio=None, anio_fin=None, categoria=None):
+        """
+        Busca libros publicados entre anio_inicio y anio_fin (inclusive).
+        
+        Los resultados se ordenan por año y, dentro de cada año, por orden
+        de inserción en el catálogo.
+        """
+        inicio = 0 if anio_inicio is None else bisect.bisect_left(self._anios_ordenados, anio_inicio)
+        fin = len(self._anios_ordenados) if anio_fin is None else bisect.bisect_right(self._anios_ordenados, anio_fin)
+        
+        en_categoria = None
+        if categoria is not None:
+            en_categoria = self._indice_categoria.get(categoria.lower(), {})
+        
+        resultados = []
+        for anio in self._anios_ordenados[inicio:fin]:
+            for isbn in self._indice_anio[anio]:
+                if en_categoria is None or isbn in en_categoria:
+                    resultados.append({'isbn': isbn, **self.catalogo[isbn]})
         return resultados
     
    
     
+    @_sincronizado
     def registrar_usuario(self, id_usuario, nombre, email):
         """
         Registra un nuevo usuario.
@@ -167,42 +1382,44 @@ class SistemaBiblioteca:
         if '@' not in email or '.' not in email:
             raise ValueError("Formato de email incorrecto (debe contener '@' y '.').")
             
-        self.usuarios[id_usuario] = {
-            'nombre': nombre,
-            'email': email,
-            'fecha_registro': datetime.now().strftime("%Y-%m-%d"),
-            'prestamos_activos': set(),
-            'historial': []
-        }
+        self._registrar_usuario(id_usuario, nombre, email, datetime.now().strftime("%Y-%m-%d"))
+    
+    @_sincronizado
+    def _registrar_usuario(self, id_usuario, nombre, email, fecha_registro):
+        """Registra un usuario ya validado."""
+        self.usuarios[id_usuario] = Usuario(nombre, email, fecha_registro)
+        self._generacion += 1
+        self._anotar('usuario', id_usuario, nombre, email, fecha_registro)
     
     def obtener_estado_usuario(self, id_usuario):
         """
         Obtiene estado completo del usuario.
         """
+        # En modo concurrente, el cerrojo del usuario impide que un préstamo
+        # o devolución cambie sus préstamos activos mientras se recorren.
+        with self._bloqueo(id_usuario):
+            return self._estado_usuario(id_usuario)
+    
+    def _estado_usuario(self, id_usuario):
+        """Estado del usuario; quien llama ya tiene tomado su cerrojo."""
         if id_usuario not in self.usuarios:
             raise UsuarioNoRegistrado(id_usuario)
             
         usuario = self.usuarios[id_usuario]
         
-        multas_pendientes = 0.0
-        for id_prestamo in usuario['historial']:
-            prestamo = self.prestamos.get(id_prestamo)
-            if prestamo and 'multa' in prestamo and not prestamo.get('pagada', False):
-                multas_pendientes += prestamo['multa']
-
-       
-        for id_prestamo in usuario['prestamos_activos']:
-            multa_actual = self._calcular_multa_actual(id_prestamo)
-            multas_pendientes += multa_actual
+        # Las multas de préstamos devueltos vienen del saldo acumulado;
+        # solo se calculan al vuelo las de préstamos aún activos.
+        multas_pendientes = self._saldo_multas.get(id_usuario, 0.0)
+        multas_pendientes += self._multas_activas(usuario)
 
         puede_prestar = (
-            len(usuario['prestamos_activos']) < self.LIMITE_PRESTAMOS and 
+            len(usuario.prestamos_activos) < self.LIMITE_PRESTAMOS and 
             multas_pendientes <= 50.0
         )
         
         return {
-            'nombre': usuario['nombre'],
-            'prestamos_activos': len(usuario['prestamos_activos']),
+            'nombre': usuario.nombre,
+            'prestamos_activos': len(usuario.prestamos_activos),
             'puede_prestar': puede_prestar,
             'multas_pendientes': round(multas_pendientes, 2)
         }
@@ -211,78 +1428,109 @@ class SistemaBiblioteca:
 
     def _get_next_prestamo_id(self):
         """Genera y retorna el siguiente ID de préstamo."""
-        id_p = f"P{self._next_prestamo_id:05d}"
-        self._next_prestamo_id += 1
+        with self._cerrojo_ids:
+            id_p = f"P{self._next_prestamo_id:05d}"
+            self._next_prestamo_id += 1
         return id_p
 
+    @staticmethod
+    def _a_fecha(valor):
+        """Convierte un string 'YYYY-MM-DD', datetime o date a date."""
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+
     def _calcular_dias_retraso(self, fecha_vencimiento, fecha_actual=None):
         """Calcula días de retraso."""
-        fecha_actual = fecha_actual or datetime.now()
+        fecha_actual = fecha_actual or date.today()
         if fecha_actual > fecha_vencimiento:
             retraso = (fecha_actual - fecha_vencimiento).days
             return retraso
         return 0
 
+    def _multas_activas(self, usuario, fecha_actual=None):
+        """Suma las multas acumuladas por los préstamos activos de un usuario."""
+        fecha_actual = fecha_actual or date.today()
+        dias_retraso = 0
+        for id_prestamo in usuario.prestamos_activos:
+            atraso = (fecha_actual - self.prestamos[id_prestamo].fecha_vencimiento).days
+            if atraso > 0:
+                dias_retraso += atraso
+        return round(dias_retraso * self.MULTA_POR_DIA, 2)
+
     def _calcular_multa_actual(self, id_prestamo):
         """Calcula la multa actual para un préstamo activo."""
         prestamo = self.prestamos.get(id_prestamo)
-        if not prestamo or prestamo.get('fecha_devolucion'):
+        if prestamo is None or prestamo.fecha_devolucion:
             return 0.0
 
-        vencimiento_str = prestamo['fecha_vencimiento']
-        fecha_vencimiento = datetime.strptime(vencimiento_str, "%Y-%m-%d")
-        
-        dias_retraso = self._calcular_dias_retraso(fecha_vencimiento)
+        dias_retraso = self._calcular_dias_retraso(prestamo.fecha_vencimiento)
         return round(dias_retraso * self.MULTA_POR_DIA, 2)
 
-    def prestar_libro(self, isbn, id_usuario):
-        """
-        Realiza un préstamo.
-        """
-      
+    def _validar_prestamo(self, isbn, id_usuario):
+        """Verifica usuario, libro, disponibilidad y límite de préstamos."""
         if id_usuario not in self.usuarios:
             raise UsuarioNoRegistrado(id_usuario)
         usuario = self.usuarios[id_usuario]
         
-       
         if isbn not in self.catalogo:
             raise LibroNoEncontrado(isbn)
         libro = self.catalogo[isbn]
         
-        if libro['copias_disponibles'] < 1:
-            raise LibroNoDisponible(isbn, libro['titulo'])
-            
+        if libro.copias_disponibles < 1 and not self._tiene_copia_reservada(isbn, id_usuario):
+            raise LibroNoDisponible(isbn, libro.titulo)
         
-        if len(usuario['prestamos_activos']) >= self.LIMITE_PRESTAMOS:
+        if len(usuario.prestamos_activos) >= self.LIMITE_PRESTAMOS:
             raise LimitePrestamosExcedido(id_usuario, self.LIMITE_PRESTAMOS)
-
-        
-        estado_usuario = self.obtener_estado_usuario(id_usuario)
-        if estado_usuario['multas_pendientes'] > 50.0:
-            raise ValueError(f"Usuario {id_usuario} tiene multas pendientes de {estado_usuario['multas_pendientes']} que exceden el límite de $50.")
+    
+    @staticmethod
+    def _verificar_multas(id_usuario, multas_pendientes):
+        """Lanza ValueError si las multas pendientes superan el límite de $50."""
+        if multas_pendientes > 50.0:
+            raise ValueError(f"Usuario {id_usuario} tiene multas pendientes de {multas_pendientes} que exceden el límite de $50.")
+    
+    def prestar_libro(self, isbn, id_usuario):
+        """
+        Realiza un préstamo.
+        """
+        self.vencer_reservas()
+        with self._bloqueo(id_usuario, isbn):
+            self._validar_prestamo(isbn, id_usuario)
             
-       
-        id_prestamo = self._get_next_prestamo_id()
-        fecha_prestamo = datetime.now()
-        fecha_vencimiento = fecha_prestamo + timedelta(days=self.DIAS_PRESTAMO)
-        
-        self.prestamos[id_prestamo] = {
-            'isbn': isbn,
-            'id_usuario': id_usuario,
-            'fecha_prestamo': fecha_prestamo.strftime("%Y-%m-%d"),
-            'fecha_vencimiento': fecha_vencimiento.strftime("%Y-%m-%d"),
-            'fecha_devolucion': None,
-            'multa': 0.0,
-            'pagada': False
-        }
-        
-        
-        usuario['prestamos_activos'].add(id_prestamo)
-        usuario['historial'].append(id_prestamo)
-        libro['copias_disponibles'] -= 1
+            estado_usuario = self._estado_usuario(id_usuario)
+            self._verificar_multas(id_usuario, estado_usuario['multas_pendientes'])
+                
+           
+            id_prestamo = self._get_next_prestamo_id()
+            fecha_prestamo = date.today()
+            fecha_vencimiento = fecha_prestamo + timedelta(days=self.DIAS_PRESTAMO)
+            
+            self._registrar_prestamo(id_prestamo, isbn, id_usuario, fecha_prestamo, fecha_vencimiento)
         
         return id_prestamo
     
+    @_sincronizado
+    def _registrar_prestamo(self, id_prestamo, isbn, id_usuario, fecha_prestamo, fecha_vencimiento):
+        """Registra un préstamo ya validado y actualiza los contadores."""
+        self.prestamos[id_prestamo] = Prestamo(isbn, id_usuario, fecha_prestamo, fecha_vencimiento)
+        
+        usuario = self.usuarios[id_usuario]
+        usuario.prestamos_activos.add(id_prestamo)
+        usuario.historial.append(id_prestamo)
+        if self._tiene_copia_reservada(isbn, id_usuario):
+            # Retira la copia apartada para su reserva
+            reserva = self.reservas[self._reserva_activa.pop((isbn, id_usuario))]
+            reserva.estado = 'cumplida'
+            self.catalogo[isbn].copias_disponibles += 1
+        self.catalogo[isbn].copias_disponibles -= 1
+        self._conteo_prestamos_libro[isbn] += 1
+        self._generacion += 1
+        heapq.heappush(self._heap_vencimientos, (fecha_vencimiento, id_prestamo))
+        self._anotar('prestamo', id_prestamo, isbn, id_usuario, fecha_prestamo.toordinal(),
+                     fecha_vencimiento.toordinal(), self._next_prestamo_id)
+    
     def devolver_libro(self, id_prestamo):
         """
         Procesa devolución de libro.
@@ -292,26 +1540,11 @@ class SistemaBiblioteca:
             
         prestamo = self.prestamos[id_prestamo]
         
-        if prestamo.get('fecha_devolucion'):
-            raise ValueError(f"Préstamo {id_prestamo} ya fue devuelto en {prestamo['fecha_devolucion']}.")
-
-        fecha_vencimiento = datetime.strptime(prestamo['fecha_vencimiento'], "%Y-%m-%d")
-        fecha_devolucion = datetime.now()
-        
-        dias_retraso = self._calcular_dias_retraso(fecha_vencimiento, fecha_devolucion)
-        multa_calculada = round(dias_retraso * self.MULTA_POR_DIA, 2)
+        with self._bloqueo(prestamo.id_usuario, prestamo.isbn):
+            if prestamo.fecha_devolucion:
+                raise ValueError(f"Préstamo {id_prestamo} ya fue devuelto en {prestamo.fecha_devolucion}.")
 
-        
-        prestamo['fecha_devolucion'] = fecha_devolucion.strftime("%Y-%m-%d")
-        prestamo['multa'] = multa_calculada
-        
-      
-        self.catalogo[prestamo['isbn']]['copias_disponibles'] += 1
-        
-       
-        id_usuario = prestamo['id_usuario']
-        if id_prestamo in self.usuarios[id_usuario]['prestamos_activos']:
-            self.usuarios[id_usuario]['prestamos_activos'].remove(id_prestamo)
+            dias_retraso, multa_calculada = self._registrar_devolucion(id_prestamo, date.today())
             
         mensaje = f"Devolución exitosa. Multa: ${multa_calculada}" if multa_calculada > 0 else "Devolución exitosa a tiempo."
         
@@ -321,6 +1554,40 @@ class SistemaBiblioteca:
             'mensaje': mensaje
         }
     
+    @_sincronizado
+    def _registrar_devolucion(self, id_prestamo, fecha_devolucion):
+        """
+        Registra la devolución de un préstamo activo ya validado.
+        
+        Retorna (dias_retraso, multa).
+        """
+        prestamo = self.prestamos[id_prestamo]
+        dias_retraso = self._calcular_dias_retraso(prestamo.fecha_vencimiento, fecha_devolucion)
+        multa_calculada = round(dias_retraso * self.MULTA_POR_DIA, 2)
+        
+        prestamo.fecha_devolucion = fecha_devolucion
+        prestamo.multa = multa_calculada
+        
+        self.catalogo[prestamo.isbn].copias_disponibles += 1
+        self._generacion += 1
+        self._asignar_reservas(prestamo.isbn, fecha_devolucion)
+        
+        id_usuario = prestamo.id_usuario
+        self.usuarios[id_usuario].prestamos_activos.discard(id_prestamo)
+        if multa_calculada > 0 and not prestamo.pagada:
+            self._saldo_multas[id_usuario] += multa_calculada
+        centavos = _centavos(multa_calculada)
+        self._multas_por_dia.sumar(fecha_devolucion, (
+            centavos,
+            1,
+            1 if centavos > 0 else 0,
+            centavos if prestamo.pagada else 0,
+            0 if prestamo.pagada else centavos
+        ))
+        self._anotar('devolucion', id_prestamo, fecha_devolucion.toordinal())
+        
+        return dias_retraso, multa_calculada
+    
     def renovar_prestamo(self, id_prestamo):
         """
         Renueva préstamo por otros N días (si no está vencido).
@@ -330,57 +1597,355 @@ class SistemaBiblioteca:
         
         prestamo = self.prestamos[id_prestamo]
         
-        if prestamo.get('fecha_devolucion'):
-            raise ValueError("No se puede renovar un préstamo ya devuelto.")
+        with self._bloqueo(prestamo.id_usuario, prestamo.isbn):
+            if prestamo.fecha_devolucion:
+                raise ValueError("No se puede renovar un préstamo ya devuelto.")
+                
+            fecha_vencimiento_actual = prestamo.fecha_vencimiento
+            
+            dias_retraso = self._calcular_dias_retraso(fecha_vencimiento_actual)
+            
+            if dias_retraso > 0:
+                raise PrestamoVencido(id_prestamo, dias_retraso)
+                
+        
+            nueva_fecha_vencimiento = fecha_vencimiento_actual + timedelta(days=self.DIAS_PRESTAMO)
+            self._registrar_renovacion(id_prestamo, nueva_fecha_vencimiento)
+        
+        return f"Préstamo {id_prestamo} renovado. Nueva fecha de vencimiento: {nueva_fecha_vencimiento:%Y-%m-%d}"
+    
+    @_sincronizado
+    def _registrar_renovacion(self, id_prestamo, nueva_fecha_vencimiento):
+        """Cambia el vencimiento de un préstamo activo ya validado."""
+        self.prestamos[id_prestamo].fecha_vencimiento = nueva_fecha_vencimiento
+        heapq.heappush(self._heap_vencimientos, (nueva_fecha_vencimiento, id_prestamo))
+        self._anotar('renovacion', id_prestamo, nueva_fecha_vencimiento.toordinal())
+    
+    def pagar_multa(self, id_prestamo):
+        """
+        Registra el pago de la multa de un préstamo devuelto.
+        
+        Retorna el monto pagado.
+        """
+        if id_prestamo not in self.prestamos:
+            raise KeyError(f"Préstamo con ID {id_prestamo} no encontrado.")
+        
+        prestamo = self.prestamos[id_prestamo]
+        
+        with self._bloqueo(prestamo.id_usuario):
+            if not prestamo.fecha_devolucion:
+                raise ValueError("Solo se pueden pagar multas de préstamos devueltos.")
+            if prestamo.multa <= 0:
+                raise ValueError(f"Préstamo {id_prestamo} no tiene multa.")
+            if prestamo.pagada:
+                raise ValueError(f"La multa del préstamo {id_prestamo} ya fue pagada.")
             
-        fecha_vencimiento_actual = datetime.strptime(prestamo['fecha_vencimiento'], "%Y-%m-%d")
+            self._registrar_pago(id_prestamo)
+        
+        return prestamo.multa
+    
+    @_sincronizado
+    def _registrar_pago(self, id_prestamo):
+        """Marca como pagada la multa de un préstamo ya validado."""
+        prestamo = self.prestamos[id_prestamo]
+        prestamo.pagada = True
+        centavos = _centavos(prestamo.multa)
+        self._multas_por_dia.sumar(prestamo.fecha_devolucion, (0, 0, 0, centavos, -centavos))
+        id_usuario = prestamo.id_usuario
+        saldo = self._saldo_multas[id_usuario] - prestamo.multa
+        self._saldo_multas[id_usuario] = saldo if saldo > 0.005 else 0.0
+        self._anotar('pago', id_prestamo)
+    
+    # -----------------------------------------------------------------------
+    # Reservas
+    # -----------------------------------------------------------------------
+    
+    def reservar_libro(self, isbn, id_usuario):
+        """
+        Pone al usuario en la cola de espera de un libro sin copias disponibles.
         
-        dias_retraso = self._calcular_dias_retraso(fecha_vencimiento_actual)
+        Cuando se devuelva (o se agregue) una copia, se aparta para la
+        primera reserva de la cola y se avisa al usuario con un evento
+        'reserva_asignada' (ver suscribir_notificaciones y notificaciones),
+        en lugar de que tenga que reintentar prestar_libro. La copia se
+        retira con prestar_libro antes de que venza el plazo de dias_reserva.
         
-        if dias_retraso > 0:
-            raise PrestamoVencido(id_prestamo, dias_retraso)
+        Returns:
+            str: ID de la reserva
+        """
+        self.vencer_reservas()
+        with self._bloqueo(id_usuario, isbn):
+            if id_usuario not in self.usuarios:
+                raise UsuarioNoRegistrado(id_usuario)
+            if isbn not in self.catalogo:
+                raise LibroNoEncontrado(isbn)
+            libro = self.catalogo[isbn]
+            if libro.copias_disponibles > 0:
+                raise ValueError(f"El libro '{libro.titulo}' tiene copias disponibles; no requiere reserva.")
+            if (isbn, id_usuario) in self._reserva_activa:
+                raise ValueError(f"Usuario {id_usuario} ya tiene una reserva activa del libro {isbn}.")
             
+            id_reserva = self._get_next_reserva_id()
+            self._registrar_reserva(id_reserva, isbn, id_usuario, date.today())
+        
+        return id_reserva
+    
+    def _get_next_reserva_id(self):
+        """Genera y retorna el siguiente ID de reserva."""
+        with self._cerrojo_ids:
+            id_r = f"R{self._next_reserva_id:05d}"
+            self._next_reserva_id += 1
+        return id_r
+    
+    @_sincronizado
+    def _registrar_reserva(self, id_reserva, isbn, id_usuario, fecha_reserva):
+        """Agrega una reserva ya validada al final de la cola de su libro."""
+        self.reservas[id_reserva] = Reserva(isbn, id_usuario, fecha_reserva)
+        self._colas_reserva[isbn].append(id_reserva)
+        self._reserva_activa[(isbn, id_usuario)] = id_reserva
+        self._anotar('reserva', id_reserva, isbn, id_usuario, fecha_reserva.toordinal(),
+                     self._next_reserva_id)
+    
+    def cancelar_reserva(self, id_reserva):
+        """Cancela una reserva en espera o asignada; una copia apartada pasa a la siguiente."""
+        if id_reserva not in self.reservas:
+            raise KeyError(f"Reserva con ID {id_reserva} no encontrada.")
+        
+        reserva = self.reservas[id_reserva]
+        
+        with self._bloqueo(reserva.id_usuario, reserva.isbn):
+            if reserva.estado not in ('en_espera', 'asignada'):
+                raise ValueError(f"Reserva {id_reserva} ya está {reserva.estado}.")
+            self._cerrar_reserva(id_reserva, 'cancelada', date.today())
+    
+    def vencer_reservas(self, fecha=None):
+        """
+        Vence las reservas asignadas cuyo plazo de retiro terminó antes de
+        `fecha` (hoy por defecto) y pasa sus copias a la siguiente reserva.
+        
+        Se llama al prestar y al reservar; solo recorre la rueda de plazos
+        la primera vez de cada día, así que las demás llamadas no cuestan.
+        
+        Returns:
+            list: IDs de las reservas vencidas
+        """
+        fecha = fecha or date.today()
+        with self._cerrojo_indices:
+            candidatas = self._rueda_reservas.avanzar(fecha.toordinal() - 1)
+        
+        vencidas = []
+        for id_reserva in candidatas:
+            reserva = self.reservas[id_reserva]
+            with self._bloqueo(reserva.id_usuario, reserva.isbn):
+                # Las entradas de reservas ya retiradas o canceladas se descartan aquí.
+                if reserva.estado != 'asignada':
+                    continue
+                if reserva.fecha_limite < fecha:
+                    self._cerrar_reserva(id_reserva, 'vencida', fecha)
+                    vencidas.append(id_reserva)
+                else:
+                    with self._cerrojo_indices:
+                        self._rueda_reservas.agregar(reserva.fecha_limite.toordinal(), id_reserva)
+        return vencidas
+    
+    @_sincronizado
+    def _cerrar_reserva(self, id_reserva, estado, fecha):
+        """Cancela o vence una reserva activa, liberando la copia que tuviera apartada."""
+        reserva = self.reservas[id_reserva]
+        asignada = reserva.estado == 'asignada'
+        reserva.estado = estado
+        del self._reserva_activa[(reserva.isbn, reserva.id_usuario)]
+        self._anotar('fin_reserva', id_reserva, estado, fecha.toordinal())
+        
+        if estado == 'vencida':
+            self._notificar('reserva_vencida', id_reserva, reserva)
+        if asignada:
+            self.catalogo[reserva.isbn].copias_disponibles += 1
+            self._generacion += 1
+            self._asignar_reservas(reserva.isbn, fecha)
+    
+    def _asignar_reservas(self, isbn, fecha):
+        """
+        Aparta las copias disponibles de un libro para las primeras reservas
+        de su cola. Cada copia se asigna en O(1) (más las canceladas que se
+        descartan de la cabeza).
+        """
+        cola = self._colas_reserva.get(isbn)
+        if not cola:
+            return
+        
+        libro = self.catalogo[isbn]
+        while cola and libro.copias_disponibles > 0:
+            id_reserva = cola.popleft()
+            reserva = self.reservas[id_reserva]
+            if reserva.estado != 'en_espera':
+                continue
+            libro.copias_disponibles -= 1
+            reserva.estado = 'asignada'
+            reserva.fecha_limite = fecha + timedelta(days=self.DIAS_RESERVA)
+            self._rueda_reservas.agregar(reserva.fecha_limite.toordinal(), id_reserva)
+            self._notificar('reserva_asignada', id_reserva, reserva)
+        
+        if not cola:
+            del self._colas_reserva[isbn]
+    
+    def _tiene_copia_reservada(self, isbn, id_usuario):
+        """Indica si el usuario tiene una copia del libro apartada para su reserva."""
+        id_reserva = self._reserva_activa.get((isbn, id_usuario))
+        return id_reserva is not None and self.reservas[id_reserva].estado == 'asignada'
+    
+    def _indexar_reservas(self):
+        """Reconstruye colas, reservas activas y plazos a partir de reservas."""
+        for id_reserva, reserva in self.reservas.items():
+            if reserva.estado == 'en_espera':
+                self._colas_reserva[reserva.isbn].append(id_reserva)
+            elif reserva.estado == 'asignada':
+                self._rueda_reservas.agregar(reserva.fecha_limite.toordinal(), id_reserva)
+            else:
+                continue
+            self._reserva_activa[(reserva.isbn, reserva.id_usuario)] = id_reserva
+    
+    def suscribir_notificaciones(self, funcion):
+        """
+        Registra una función que recibe cada evento de reserva (un dict con
+        'tipo', 'id_reserva', 'isbn', 'id_usuario' y 'fecha_limite').
+        
+        Se llama con los cerrojos del sistema tomados: debe ser breve y no
+        llamar al sistema (por ejemplo, encolar el evento para otro hilo).
+        """
+        self._suscriptores.append(funcion)
     
-        nueva_fecha_vencimiento = fecha_vencimiento_actual + timedelta(days=self.DIAS_PRESTAMO)
-        prestamo['fecha_vencimiento'] = nueva_fecha_vencimiento.strftime("%Y-%m-%d")
+    def _notificar(self, tipo, id_reserva, reserva):
+        """Guarda el evento para el usuario y lo pasa a los suscriptores."""
+        evento = {
+            'tipo': tipo,
+            'id_reserva': id_reserva,
+            'isbn': reserva.isbn,
+            'id_usuario': reserva.id_usuario,
+            'fecha_limite': reserva.fecha_limite.strftime("%Y-%m-%d")
+        }
+        self._avisos[reserva.id_usuario].append(evento)
+        for funcion in self._suscriptores:
+            funcion(evento)
+    
+    @_sincronizado
+    def notificaciones(self, id_usuario):
+        """
+        Retorna y marca como leídos los eventos de reserva pendientes del
+        usuario. Se omiten los avisos de asignación de reservas que ya no
+        están asignadas.
+        """
+        avisos = self._avisos.pop(id_usuario, ())
+        return [evento for evento in avisos
+                if evento['tipo'] != 'reserva_asignada' or self.reservas[evento['id_reserva']].estado == 'asignada']
+    
+    # -----------------------------------------------------------------------
+    # Operaciones por lote
+    # -----------------------------------------------------------------------
+    
+    def prestar_lote(self, solicitudes):
+        """
+        Realiza varios préstamos de una sola vez.
+        
+        Args:
+            solicitudes: Iterable de tuplas (isbn, id_usuario)
+        
+        Returns:
+            list: Por cada solicitud, el ID del préstamo creado o la
+                  excepción que impidió realizarlo (el lote no se aborta).
+        """
+        self.vencer_reservas()
+        fecha_prestamo = date.today()
+        fecha_vencimiento = fecha_prestamo + timedelta(days=self.DIAS_PRESTAMO)
+        # Los préstamos nuevos vencen en el futuro, así que las multas de
+        # cada usuario no cambian durante el lote: se calculan una vez.
+        multas_por_usuario = {}
+        resultados = []
+        
+        for isbn, id_usuario in solicitudes:
+            try:
+                with self._bloqueo(id_usuario, isbn):
+                    self._validar_prestamo(isbn, id_usuario)
+                    
+                    multas = multas_por_usuario.get(id_usuario)
+                    if multas is None:
+                        multas = round(self._saldo_multas.get(id_usuario, 0.0) +
+                                       self._multas_activas(self.usuarios[id_usuario], fecha_prestamo), 2)
+                        multas_por_usuario[id_usuario] = multas
+                    self._verificar_multas(id_usuario, multas)
+                    
+                    id_prestamo = self._get_next_prestamo_id()
+                    self._registrar_prestamo(id_prestamo, isbn, id_usuario, fecha_prestamo, fecha_vencimiento)
+                resultados.append(id_prestamo)
+            except (ErrorBiblioteca, ValueError) as e:
+                resultados.append(e)
+        
+        return resultados
+    
+    def devolver_lote(self, ids_prestamo):
+        """
+        Procesa varias devoluciones de una sola vez.
+        
+        Returns:
+            list: Por cada ID, el dict de devolver_libro o la excepción
+                  que impidió procesarla (el lote no se aborta).
+        """
+        fecha_devolucion = date.today()
+        resultados = []
+        
+        for id_prestamo in ids_prestamo:
+            prestamo = self.prestamos.get(id_prestamo)
+            if prestamo is None:
+                resultados.append(KeyError(f"Préstamo con ID {id_prestamo} no encontrado."))
+                continue
+            with self._bloqueo(prestamo.id_usuario, prestamo.isbn):
+                if prestamo.fecha_devolucion:
+                    resultados.append(ValueError(f"Préstamo {id_prestamo} ya fue devuelto en {prestamo.fecha_devolucion}."))
+                    continue
+                
+                dias_retraso, multa = self._registrar_devolucion(id_prestamo, fecha_devolucion)
+            resultados.append({
+                'dias_retraso': dias_retraso,
+                'multa': multa,
+                'mensaje': f"Devolución exitosa. Multa: ${multa}" if multa > 0 else "Devolución exitosa a tiempo."
+            })
         
-        return f"Préstamo {id_prestamo} renovado. Nueva fecha de vencimiento: {prestamo['fecha_vencimiento']}"
+        return resultados
     
   
     
+    @_sincronizado
+    @_memorizado
     def libros_mas_prestados(self, n=10):
         """
         Retorna los N libros más prestados.
         """
-        conteo_prestamos = {}
-        for prestamo in self.prestamos.values():
-            isbn = prestamo['isbn']
-            conteo_prestamos[isbn] = conteo_prestamos.get(isbn, 0) + 1
-            
-      
-        ranking = sorted(conteo_prestamos.items(), key=lambda item: item[1], reverse=True)
+        ranking = heapq.nlargest(n, self._conteo_prestamos_libro.items(), key=itemgetter(1))
         
         resultados = []
-        for isbn, cantidad in ranking[:n]:
+        for isbn, cantidad in ranking:
             titulo = self.catalogo.get(isbn, {}).get('titulo', 'Título Desconocido')
             resultados.append((isbn, titulo, cantidad))
             
         return resultados
     
+    @_sincronizado
+    @_memorizado
     def usuarios_mas_activos(self, n=5):
         """
         Retorna los N usuarios más activos (más préstamos históricos).
         """
-        ranking_usuarios = []
-        for id_usuario, info in self.usuarios.items():
-            total_prestamos = len(info['historial'])
-            ranking_usuarios.append((id_usuario, info['nombre'], total_prestamos))
-            
-        
-        ranking_usuarios.sort(key=lambda item: item[2], reverse=True)
+        # len(historial) ya es el contador de préstamos de cada usuario.
+        ranking_usuarios = heapq.nlargest(
+            n,
+            ((id_usuario, info.nombre, len(info.historial)) for id_usuario, info in self.usuarios.items()),
+            key=itemgetter(2)
+        )
         
-        return ranking_usuarios[:n]
+        return ranking_usuarios
     
+    @_sincronizado
+    @_memorizado
     def estadisticas_categoria(self, categoria):
         """
         Genera estadísticas de una categoría.
@@ -393,12 +1958,12 @@ class SistemaBiblioteca:
         libros_en_categoria = {}
 
         
-        for isbn, info in self.catalogo.items():
-            if info['categoria'].lower() == categoria_lower:
-                total_libros += 1
-                total_copias += info['copias_total']
-                copias_prestadas += info['copias_total'] - info['copias_disponibles']
-                libros_en_categoria[isbn] = 0
+        for isbn in self._indice_categoria.get(categoria_lower, ()):
+            info = self.catalogo[isbn]
+            total_libros += 1
+            total_copias += info.copias_total
+            copias_prestadas += info.copias_total - info.copias_disponibles
+            libros_en_categoria[isbn] = self._conteo_prestamos_libro.get(isbn, 0)
 
         if total_libros == 0:
             return {
@@ -406,12 +1971,6 @@ class SistemaBiblioteca:
                 'tasa_prestamo': 0.0, 'libro_mas_popular': 'N/A'
             }
 
-        
-        for prestamo in self.prestamos.values():
-            isbn = prestamo['isbn']
-            if isbn in libros_en_categoria:
-                libros_en_categoria[isbn] += 1
-
    
         total_prestamos_categoria = sum(libros_en_categoria.values())
         tasa_prestamo = round((total_prestamos_categoria / total_copias) if total_copias > 0 else 0.0, 4)
@@ -421,9 +1980,9 @@ class SistemaBiblioteca:
         
         libro_mas_popular_titulo = 'N/A'
         if libro_mas_popular_isbn and libros_en_categoria[libro_mas_popular_isbn] > 0:
-            libro_mas_popular_titulo = self.catalogo[libro_mas_popular_isbn]['titulo']
+            libro_mas_popular_titulo = self.catalogo[libro_mas_popular_isbn].titulo
         elif libro_mas_popular_isbn:
-             libro_mas_popular_titulo = self.catalogo[libro_mas_popular_isbn]['titulo'] + " (0 préstamos)"
+             libro_mas_popular_titulo = self.catalogo[libro_mas_popular_isbn].titulo + " (0 préstamos)"
 
         return {
             'total_libros': total_libros,
@@ -433,156 +1992,626 @@ class SistemaBiblioteca:
             'libro_mas_popular': libro_mas_popular_titulo
         }
     
+    def _ids_vencidos(self, hoy):
+        """
+        Retorna los IDs de préstamos activos con vencimiento anterior a hoy,
+        del más antiguo al más reciente.
+        
+        Solo se extrae del montículo el prefijo ya vencido; las entradas
+        obsoletas se descartan y las vigentes se vuelven a insertar.
+        """
+        heap = self._heap_vencimientos
+        vigentes = []
+        while heap and heap[0][0] < hoy:
+            entrada = heapq.heappop(heap)
+            fecha_vencimiento, id_prestamo = entrada
+            prestamo = self.prestamos.get(id_prestamo)
+            if (prestamo is not None and prestamo.fecha_devolucion is None
+                    and prestamo.fecha_vencimiento == fecha_vencimiento):
+                vigentes.append(entrada)
+        
+        for entrada in vigentes:
+            heapq.heappush(heap, entrada)
+        return [id_prestamo for _, id_prestamo in vigentes]
+    
+    @_sincronizado
     def prestamos_vencidos(self):
         """
-        Lista préstamos actualmente vencidos.
+        Lista préstamos actualmente vencidos, del más atrasado al más reciente.
         """
         vencidos = []
-        now = datetime.now()
+        hoy = date.today()
         
-        for id_prestamo, prestamo in self.prestamos.items():
-          
-            if prestamo['fecha_devolucion'] is None:
-                fecha_vencimiento = datetime.strptime(prestamo['fecha_vencimiento'], "%Y-%m-%d")
-                dias_retraso = self._calcular_dias_retraso(fecha_vencimiento, now)
-                
-                if dias_retraso > 0:
-                    multa_acumulada = round(dias_retraso * self.MULTA_POR_DIA, 2)
-                    
-                    libro_info = self.catalogo.get(prestamo['isbn'], {'titulo': 'Desconocido'})
-                    
-                    vencidos.append({
-                        'id_prestamo': id_prestamo,
-                        'isbn': prestamo['isbn'],
-                        'titulo': libro_info['titulo'],
-                        'id_usuario': prestamo['id_usuario'],
-                        'dias_retraso': dias_retraso,
-                        'multa_acumulada': multa_acumulada
-                    })
+        for id_prestamo in self._ids_vencidos(hoy):
+            prestamo = self.prestamos[id_prestamo]
+            dias_retraso = self._calcular_dias_retraso(prestamo.fecha_vencimiento, hoy)
+            multa_acumulada = round(dias_retraso * self.MULTA_POR_DIA, 2)
+            
+            libro_info = self.catalogo.get(prestamo.isbn, {'titulo': 'Desconocido'})
+            
+            vencidos.append({
+                'id_prestamo': id_prestamo,
+                'isbn': prestamo.isbn,
+                'titulo': libro_info['titulo'],
+                'id_usuario': prestamo.id_usuario,
+                'dias_retraso': dias_retraso,
+                'multa_acumulada': multa_acumulada
+            })
                     
         return vencidos
     
+    @_sincronizado
     def reporte_financiero(self, fecha_inicio=None, fecha_fin=None):
         """
         Genera reporte financiero de multas.
+        
+        fecha_inicio y fecha_fin aceptan 'YYYY-MM-DD' o date. Las multas de
+        préstamos devueltos se leen del acumulado por día de devolución.
         """
-        total_multas = 0.0
-        multas_pagadas = 0.0
-        multas_pendientes = 0.0
-        prestamos_con_multa = 0
-        total_multas_contadas = 0
-
-        dt_inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d") if fecha_inicio else None
-        dt_fin = datetime.strptime(fecha_fin, "%Y-%m-%d") if fecha_fin else None
-
-        for id_prestamo, prestamo in self.prestamos.items():
-            if prestamo['fecha_devolucion']:
-                fecha_devolucion = datetime.strptime(prestamo['fecha_devolucion'], "%Y-%m-%d")
-                
-           
-                if (dt_inicio is None or fecha_devolucion >= dt_inicio) and \
-                   (dt_fin is None or fecha_devolucion <= dt_fin):
-
-                    multa = prestamo.get('multa', 0.0)
-                    total_multas += multa
-                    total_multas_contadas += 1
-
-                    if multa > 0:
-                        prestamos_con_multa += 1
+        return self._formatear_reporte_financiero(*self._acumulados_financieros(fecha_inicio, fecha_fin))
+    
+    @_sincronizado
+    def _acumulados_financieros(self, fecha_inicio=None, fecha_fin=None):
+        """
+        Sumas exactas del reporte financiero: (total_multas, multas_pagadas,
+        multas_pendientes, prestamos_con_multa, total_multas_contadas), con
+        los montos en centavos enteros. Se pueden sumar entre sistemas.
+        """
+        dt_inicio = self._a_fecha(fecha_inicio) if fecha_inicio else None
+        dt_fin = self._a_fecha(fecha_fin) if fecha_fin else None
 
-                    if prestamo.get('pagada', False):
-                        multas_pagadas += multa
-                    else:
-                        multas_pendientes += multa
+        (total_multas, total_multas_contadas, prestamos_con_multa,
+         multas_pagadas, multas_pendientes) = self._multas_por_dia.rango(dt_inicio, dt_fin)
         
         
-        if dt_fin is None or dt_fin >= datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
-            for id_prestamo, prestamo in self.prestamos.items():
-                if prestamo['fecha_devolucion'] is None:
-                    multa_activa = self._calcular_multa_actual(id_prestamo)
-                    
-               
-                    if multa_activa > 0:
-                       
-                        total_multas += multa_activa
-                        multas_pendientes += multa_activa
-                        prestamos_con_multa += 1
-                        total_multas_contadas += 1
-
+        hoy = date.today()
+        if dt_fin is None or dt_fin >= hoy:
+            # Un préstamo activo solo tiene multa si ya está vencido.
+            for id_prestamo in self._ids_vencidos(hoy):
+                multa_activa = _centavos(self._calcular_multa_actual(id_prestamo))
+                if multa_activa > 0:
+                    total_multas += multa_activa
+                    multas_pendientes += multa_activa
+                    prestamos_con_multa += 1
+                    total_multas_contadas += 1
+        
+        return total_multas, multas_pagadas, multas_pendientes, prestamos_con_multa, total_multas_contadas
+    
+    @staticmethod
+    def _formatear_reporte_financiero(total_multas, multas_pagadas, multas_pendientes,
+                                      prestamos_con_multa, total_multas_contadas):
+        """Arma el dict de reporte_financiero a partir de sus acumulados (en centavos)."""
+        total_multas /= 100
         promedio_multa = round((total_multas / total_multas_contadas) if total_multas_contadas > 0 else 0.0, 2)
             
         return {
             'total_multas': round(total_multas, 2),
-            'multas_pagadas': round(multas_pagadas, 2),
-            'multas_pendientes': round(multas_pendientes, 2),
+            'multas_pagadas': round(multas_pagadas / 100, 2),
+            'multas_pendientes': round(multas_pendientes / 100, 2),
             'prestamos_con_multa': prestamos_con_multa,
             'promedio_multa': promedio_multa
         }
     
 
     
-    def exportar_catalogo(self, archivo='catalogo.txt'):
+    def exportar_catalogo(self, archivo='catalogo.txt', formato='pipe', comprimir=None, particiones=1,
+                          tamano_bloque=10000, hilos=None):
         """
         Exporta catálogo a archivo de texto.
         Formato: ISBN|Título|Autor|Año|Categoría|Copias
+        
+        Args:
+            formato: 'pipe' (el de importar_catalogo), 'csv' o 'tsv'; estos dos
+                     llevan cabecera (solo en la primera partición) y escapan
+                     separadores ('|', ',', tabs) y comillas dentro de los campos
+            comprimir: None, 'gzip', 'bz2' o 'xz'; si es None se deduce de la
+                       extensión del archivo ('.gz', '.bz2', '.xz')
+            particiones: Número de archivos; cada uno recibe un tramo
+                         contiguo del catálogo, así que concatenarlos da la
+                         exportación completa. Se escriben en paralelo.
+            tamano_bloque: Libros por cada escritura
+            hilos: Hilos de escritura (None = uno por partición)
+        
+        Returns:
+            dict: {'archivos', 'libros', 'segundos', 'libros_por_segundo'}
         """
+        if formato not in ('pipe', 'csv', 'tsv'):
+            raise ValueError(f"Formato de exportación desconocido: {formato}")
+        if comprimir is None:
+            comprimir = next((nombre for nombre, (_, sufijo, _) in _COMPRESORES.items()
+                              if archivo.endswith(sufijo)), None)
+        elif comprimir not in _COMPRESORES:
+            raise ValueError(f"Compresión desconocida: {comprimir}")
+        if particiones < 1:
+            raise ValueError("El número de particiones debe ser positivo.")
+        
+        inicio = time.perf_counter()
+        # Solo la copia de las listas necesita el cerrojo: la escritura no
+        # bloquea préstamos ni devoluciones.
+        with self._cerrojo_indices:
+            isbns = list(self.catalogo)
+            libros = list(self.catalogo.values())
+        archivos = _nombres_particiones(archivo, comprimir, particiones)
+        tramo = -(-len(libros) // particiones)
+        
         try:
-            with open(archivo, 'w', encoding='utf-8') as f:
-                for isbn, info in self.catalogo.items():
-                    linea = f"{isbn}|{info['titulo']}|{info['autor']}|{info['anio']}|{info['categoria']}|{info['copias_total']}\n"
-                    f.write(linea)
+            if particiones == 1:
+                _escribir_particion(archivo, isbns, libros, formato, comprimir, tamano_bloque)
+            else:
+                with ThreadPoolExecutor(max_workers=hilos or particiones) as ejecutor:
+                    list(ejecutor.map(
+                        _escribir_particion, archivos,
+                        [isbns[i * tramo:(i + 1) * tramo] for i in range(particiones)],
+                        [libros[i * tramo:(i + 1) * tramo] for i in range(particiones)],
+                        [formato] * particiones, [comprimir] * particiones, [tamano_bloque] * particiones,
+                        [i == 0 for i in range(particiones)]
+                    ))
             print(f"Catálogo exportado exitosamente a '{archivo}'.")
         except IOError as e:
             print(f"Error al escribir en el archivo '{archivo}': {e}")
             raise
+        
+        segundos = time.perf_counter() - inicio
+        return {
+            'archivos': archivos,
+            'libros': len(libros),
+            'segundos': round(segundos, 4),
+            'libros_por_segundo': round(len(libros) / segundos, 1) if segundos > 0 else 0.0
+        }
     
-    def importar_catalogo(self, archivo='catalogo.txt'):
+    def importar_catalogo(self, archivo='catalogo.txt', tamano_bloque=10000, procesos=None,
+                          max_errores=None, archivo_errores=None):
         """
         Importa catálogo desde archivo de texto.
+        
+        El archivo se lee por bloques de tamano_bloque líneas. Con procesos > 1
+        el parseo y la validación de los bloques se reparten en un pool de
+        procesos; la inserción en el catálogo siempre es secuencial. El índice
+        de texto de los libros importados se construye en la primera búsqueda.
+        En modo concurrente el cerrojo de índices se toma bloque a bloque, de
+        modo que préstamos y reportes pueden intercalarse con la importación.
+        
+        Args:
+            max_errores: Máximo de errores conservados en memoria (None = todos)
+            archivo_errores: Si se indica, todos los errores se escriben ahí
+        
+        Returns:
+            dict: {'exitosos', 'errores', 'total_errores', 'segundos', 'libros_por_segundo'}
         """
         exitosos = 0
         errores = []
+        total_errores = 0
         
         if not os.path.exists(archivo):
             raise FileNotFoundError(f"El archivo '{archivo}' no existe.")
+        
+        anio_max = date.today().year
+        inicio = time.perf_counter()
+        salida_errores = open(archivo_errores, 'w', encoding='utf-8') if archivo_errores else None
+        
+        def registrar_error(num_linea, mensaje):
+            nonlocal total_errores
+            total_errores += 1
+            if max_errores is None or len(errores) < max_errores:
+                errores.append((num_linea, mensaje))
+            if salida_errores is not None:
+                salida_errores.write(f"{num_linea}|{mensaje}\n")
             
         try:
             with open(archivo, 'r', encoding='utf-8') as f:
-                for num_linea, linea in enumerate(f, 1):
-                    linea = linea.strip()
-                    if not linea:
-                        continue
-                        
-                    try:
-                        partes = linea.split('|')
-                        if len(partes) != 6:
-                            raise ValueError("Número incorrecto de campos.")
+                lineas = enumerate(f, 1)
+                bloques = iter(lambda: list(islice(lineas, tamano_bloque)), [])
+                
+                for libros, errores_bloque in self._parsear_bloques(bloques, anio_max, procesos):
+                    # Los errores de parseo y los duplicados se reportan en orden de línea.
+                    errores_bloque = deque(errores_bloque)
+                    with self._cerrojo_indices:
+                        for num_linea, isbn, titulo, autor, anio, categoria, copias in libros:
+                            while errores_bloque and errores_bloque[0][0] < num_linea:
+                                registrar_error(*errores_bloque.popleft())
                             
-                        isbn, titulo, autor, anio_str, categoria, copias_str = partes
-                        
-                        if isbn in self.catalogo:
-                            errores.append((num_linea, f"ISBN {isbn} ya existe (duplicado, omitido)."))
-                            continue
+                            if isbn in self.catalogo:
+                                registrar_error(num_linea, f"ISBN {isbn} ya existe (duplicado, omitido).")
+                                continue
                             
-                        anio = int(anio_str)
-                        copias = int(copias_str)
-
-                        try:
-                            self.agregar_libro(isbn, titulo, autor, anio, categoria, copias)
+                            self._insertar_libro(isbn, titulo, autor, anio, categoria, copias, diferir_texto=True)
                             exitosos += 1
-                        except Exception as e:
-                            
-                            if isbn in self.catalogo:
-                                del self.catalogo[isbn] 
-                            raise e
-
-                    except Exception as e:
-                        errores.append((num_linea, f"Error de formato/validación: {e}"))
+                    
+                    while errores_bloque:
+                        registrar_error(*errores_bloque.popleft())
 
         except IOError as e:
             raise IOError(f"Error al leer el archivo '{archivo}': {e}")
+        finally:
+            if salida_errores is not None:
+                salida_errores.close()
+        
+        segundos = time.perf_counter() - inicio
+        return {
+            'exitosos': exitosos,
+            'errores': errores,
+            'total_errores': total_errores,
+            'segundos': round(segundos, 4),
+            'libros_por_segundo': round(exitosos / segundos, 1) if segundos > 0 else 0.0
+        }
+    
+    @staticmethod
+    def _parsear_bloques(bloques, anio_max, procesos=None):
+        """
+        Genera (libros, errores) por bloque, en orden.
+        
+        Con un pool de procesos se mantienen como máximo 2 * procesos bloques
+        en vuelo para no cargar el archivo completo en memoria.
+        """
+        if not procesos or procesos <= 1:
+            for bloque in bloques:
+                yield _parsear_bloque(bloque, anio_max)
+            return
+        
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            pendientes = deque()
+            for bloque in bloques:
+                pendientes.append(pool.submit(_parsear_bloque, bloque, anio_max))
+                if len(pendientes) >= 2 * procesos:
+                    yield pendientes.popleft().result()
+            while pendientes:
+                yield pendientes.popleft().result()
+    
+    # -----------------------------------------------------------------------
+    # Instantáneas binarias del estado completo
+    # -----------------------------------------------------------------------
+    
+    @_sincronizado
+    def guardar_estado(self, archivo='biblioteca.snap'):
+        """
+        Guarda catálogo, usuarios, préstamos y contadores en formato binario.
+        
+        Cada campo se guarda como una columna de array (enteros, fechas como
+        ordinales, montos como double) y los textos en una tabla de cadenas.
+        
+        Returns:
+            int: Tamaño del archivo en bytes
+        """
+        cadenas = _TablaCadenas()
+        
+        libros_cad = array('I')
+        libros_num = array('i')
+        for isbn, info in self.catalogo.items():
+            libros_cad.extend((cadenas.id(isbn), cadenas.id(info.titulo),
+                               cadenas.id(info.autor), cadenas.id(info.categoria)))
+            libros_num.extend((info.anio, info.copias_total, info.copias_disponibles))
+        
+        usuarios_cad = array('I')
+        cadena_usuario = {}
+        for id_usuario, info in self.usuarios.items():
+            cadena_usuario[id_usuario] = cadenas.id(_cadena_de_id_usuario(id_usuario))
+            usuarios_cad.extend((cadena_usuario[id_usuario], cadenas.id(info.nombre),
+                                 cadenas.id(info.email), cadenas.id(info.fecha_registro)))
+        
+        prestamos_cad = array('I')
+        prestamos_fechas = array('i')
+        prestamos_multa = array('d')
+        prestamos_pagada = array('B')
+        for id_prestamo, prestamo in self.prestamos.items():
+            prestamos_cad.extend((cadenas.id(id_prestamo), cadenas.id(prestamo.isbn),
+                                  cadena_usuario[prestamo.id_usuario]))
+            devolucion = prestamo.fecha_devolucion
+            prestamos_fechas.extend((prestamo.fecha_prestamo.toordinal(),
+                                     prestamo.fecha_vencimiento.toordinal(),
+                                     devolucion.toordinal() if devolucion else 0))
+            prestamos_multa.append(prestamo.multa)
+            prestamos_pagada.append(1 if prestamo.pagada else 0)
+        
+        reservas_cad = array('I')
+        reservas_num = array('i')
+        for id_reserva, reserva in self.reservas.items():
+            reservas_cad.extend((cadenas.id(id_reserva), cadenas.id(reserva.isbn),
+                                 cadena_usuario[reserva.id_usuario]))
+            limite = reserva.fecha_limite
+            reservas_num.extend((reserva.fecha_reserva.toordinal(), limite.toordinal() if limite else 0,
+                                 _ESTADOS_RESERVA.index(reserva.estado)))
+        cabecera_reservas = _CABECERA_RESERVAS.pack(
+            _FIRMA_RESERVAS, self.DIAS_RESERVA, self._next_reserva_id, len(self.reservas)
+        )
+        
+        datos_cadenas = cadenas.datos()
+        cabecera = _CABECERA_INSTANTANEA.pack(
+            _FIRMA_INSTANTANEA, sys.byteorder == 'little', self.DIAS_PRESTAMO,
+            self.MULTA_POR_DIA, self.LIMITE_PRESTAMOS, self._next_prestamo_id,
+            self._secuencia_diario, len(cadenas.desplazamientos) - 1, len(datos_cadenas),
+            len(self.catalogo), len(self.usuarios), len(self.prestamos)
+        )
+        
+        with open(archivo, 'wb') as f:
+            f.write(cabecera)
+            for seccion in (cadenas.desplazamientos, datos_cadenas, libros_cad, libros_num,
+                            usuarios_cad, prestamos_cad, prestamos_fechas,
+                            prestamos_multa, prestamos_pagada,
+                            cabecera_reservas, reservas_cad, reservas_num):
+                bloque = seccion if isinstance(seccion, bytes) else seccion.tobytes()
+                f.write(bloque)
+                # Cada sección empieza alineada a 8 bytes.
+                f.write(b'\0' * (-len(bloque) % 8))
+            tamano = f.tell()
+            f.flush()
+            os.fsync(f.fileno())
+            return tamano
+    
+    @classmethod
+    def cargar_estado(cls, archivo='biblioteca.snap', usar_mmap=False, **opciones):
+        """
+        Crea un sistema a partir de una instantánea de guardar_estado.
+        
+        Con usar_mmap=True las columnas se leen directamente del archivo
+        mapeado en memoria, sin copiarlo completo antes de decodificarlo.
+        Las opciones (concurrente, dias_reserva, tamano_cache) se pasan al constructor.
+        """
+        if not os.path.exists(archivo):
+            raise FileNotFoundError(f"El archivo '{archivo}' no existe.")
+        
+        with open(archivo, 'rb') as f:
+            if usar_mmap:
+                contenido = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                contenido = f.read()
+        
+        vista = memoryview(contenido)
+        try:
+            return cls._desde_instantanea(vista, **opciones)
+        except Exception as error:
+            if usar_mmap:
+                # Los marcos del traceback conservan vistas sobre el mmap, que
+                # impedirían cerrarlo y ocultarían el error original.
+                traceback.clear_frames(error.__traceback__)
+            raise
+        finally:
+            vista.release()
+            if usar_mmap:
+                contenido.close()
+    
+    @classmethod
+    def _desde_instantanea(cls, vista, **opciones):
+        """Decodifica una instantánea binaria desde un memoryview."""
+        if len(vista) < _CABECERA_INSTANTANEA.size:
+            raise ValueError("Archivo de instantánea incompleto.")
+        (firma, little_endian, dias_prestamo, multa_por_dia, limite_prestamos, siguiente_id,
+         secuencia, num_cadenas, tam_cadenas, num_libros, num_usuarios, num_prestamos) = \
+            _CABECERA_INSTANTANEA.unpack_from(vista)
+        if firma != _FIRMA_INSTANTANEA:
+            raise ValueError("El archivo no es una instantánea de la biblioteca.")
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise ValueError("La instantánea se generó con otro orden de bytes.")
+        
+        posicion = _CABECERA_INSTANTANEA.size
+        
+        def leer(codigo, cantidad):
+            nonlocal posicion
+            tamano = array(codigo).itemsize * cantidad
+            columna = vista[posicion:posicion + tamano]
+            if len(columna) != tamano:
+                raise ValueError("Archivo de instantánea incompleto.")
+            posicion += tamano + (-tamano % 8)
+            return columna.cast(codigo) if codigo != 'B' else columna
+        
+        desplazamientos = leer('Q', num_cadenas + 1).tolist()
+        datos = leer('B', tam_cadenas).tobytes()
+        cadenas = [datos[desplazamientos[i]:desplazamientos[i + 1]].decode('utf-8')
+                   for i in range(num_cadenas)]
+        
+        # Agrupa una columna plana en tuplas de n campos: [a, b, a, b] -> (a, b), (a, b)
+        def filas(codigo, campos, cantidad, convertir=None):
+            valores = leer(codigo, campos * cantidad).tolist()
+            if convertir is not None:
+                valores = [convertir[v] for v in valores]
+            iterador = iter(valores)
+            return zip(*([iterador] * campos))
+        
+        libros_cad = filas('I', 4, num_libros, cadenas)
+        libros_num = filas('i', 3, num_libros)
+        usuarios_cad = filas('I', 4, num_usuarios, cadenas)
+        prestamos_cad = filas('I', 3, num_prestamos, cadenas)
+        prestamos_fechas = leer('i', 3 * num_prestamos).tolist()
+        prestamos_multa = leer('d', num_prestamos).tolist()
+        prestamos_pagada = leer('B', num_prestamos).tolist()
+        
+        dias_reserva, siguiente_reserva, reservas_cad, reservas_num = 3, 1, (), ()
+        # Las instantáneas anteriores a las reservas terminan aquí; cualquier
+        # byte más es la sección de reservas, y si está cortada es un error.
+        if len(vista) > posicion:
+            firma, dias_reserva, siguiente_reserva, num_reservas = \
+                _CABECERA_RESERVAS.unpack(leer('B', _CABECERA_RESERVAS.size))
+            if firma != _FIRMA_RESERVAS:
+                raise ValueError("Sección de reservas de la instantánea no reconocida.")
+            reservas_cad = filas('I', 3, num_reservas, cadenas)
+            reservas_num = filas('i', 3, num_reservas)
+        
+        # Solo hay IDs de usuario codificados (ver _cadena_de_id_usuario) si
+        # alguna cadena contiene NUL.
+        if b'\0' in datos:
+            usuarios_cad = [(_id_usuario_de_cadena(id_usuario), *resto) for id_usuario, *resto in usuarios_cad]
+            prestamos_cad = [(id_prestamo, isbn, _id_usuario_de_cadena(id_usuario))
+                             for id_prestamo, isbn, id_usuario in prestamos_cad]
+            reservas_cad = [(id_reserva, isbn, _id_usuario_de_cadena(id_usuario))
+                            for id_reserva, isbn, id_usuario in reservas_cad]
+        
+        opciones.setdefault('dias_reserva', dias_reserva)
+        sistema = cls(dias_prestamo=dias_prestamo, multa_por_dia=multa_por_dia,
+                      limite_prestamos=limite_prestamos, **opciones)
+        sistema._next_prestamo_id = siguiente_id
+        sistema._next_reserva_id = siguiente_reserva
+        sistema._secuencia_diario = secuencia
+        
+        for (isbn, titulo, autor, categoria), (anio, copias_total, copias_disponibles) in zip(libros_cad, libros_num):
+            sistema.catalogo[isbn] = Libro(titulo, autor, anio, categoria, copias_total, copias_disponibles)
         
-        return {'exitosos': exitosos, 'errores': errores}
+        for id_usuario, nombre, email, fecha_registro in usuarios_cad:
+            sistema.usuarios[id_usuario] = Usuario(nombre, email, fecha_registro)
+        
+        # Las fechas se repiten mucho: se crea un solo objeto date por ordinal.
+        fechas = {0: None}
+        for ordinal in set(prestamos_fechas):
+            if ordinal:
+                fechas[ordinal] = date.fromordinal(ordinal)
+        iterador = iter([fechas[ordinal] for ordinal in prestamos_fechas])
+        prestamos_fechas = zip(iterador, iterador, iterador)
+        
+        usuarios = sistema.usuarios
+        prestamos = sistema.prestamos
+        for (id_prestamo, isbn, id_usuario), (fecha_prestamo, fecha_vencimiento, fecha_devolucion), multa, pagada in \
+                zip(prestamos_cad, prestamos_fechas, prestamos_multa, prestamos_pagada):
+            prestamos[id_prestamo] = Prestamo(isbn, id_usuario, fecha_prestamo, fecha_vencimiento,
+                                              fecha_devolucion, multa, pagada == 1)
+            usuario = usuarios[id_usuario]
+            usuario.historial.append(id_prestamo)
+            if fecha_devolucion is None:
+                usuario.prestamos_activos.add(id_prestamo)
+        
+        for (id_reserva, isbn, id_usuario), (fecha_reserva, fecha_limite, estado) in zip(reservas_cad, reservas_num):
+            sistema.reservas[id_reserva] = Reserva(isbn, id_usuario, date.fromordinal(fecha_reserva),
+                                                   _ESTADOS_RESERVA[estado],
+                                                   date.fromordinal(fecha_limite) if fecha_limite else None)
+        
+        sistema._reconstruir_indices()
+        return sistema
+    
+    # -----------------------------------------------------------------------
+    # Métricas
+    # -----------------------------------------------------------------------
+    
+    def activar_metricas(self):
+        """
+        Empieza a registrar métricas de uso y retorna el MetricasBiblioteca.
+        
+        Los métodos públicos se reemplazan, solo en esta instancia, por
+        versiones cronometradas; al desactivar las métricas se quitan, de modo
+        que mientras están desactivadas no agregan ningún costo.
+        """
+        if self._metricas is None:
+            self._metricas = MetricasBiblioteca(concurrente=self._cerrojos_usuario is not None)
+            for nombre in _METODOS_INSTRUMENTADOS:
+                setattr(self, nombre, self._metricas.envolver(nombre, getattr(self, nombre)))
+        return self._metricas
+    
+    def desactivar_metricas(self):
+        """Deja de registrar métricas; retorna las acumuladas hasta ahora."""
+        metricas, self._metricas = self._metricas, None
+        if metricas is not None:
+            for nombre in _METODOS_INSTRUMENTADOS:
+                delattr(self, nombre)
+        return metricas
+    
+    def metricas(self):
+        """Instantánea de las métricas como dict ({} si están desactivadas)."""
+        return self._metricas.instantanea() if self._metricas is not None else {}
+    
+    def metricas_prometheus(self, prefijo='biblioteca'):
+        """Métricas en formato de texto de Prometheus ('' si están desactivadas)."""
+        return self._metricas.texto_prometheus(prefijo) if self._metricas is not None else ''
+    
+    # -----------------------------------------------------------------------
+    # Diario de operaciones (durabilidad)
+    # -----------------------------------------------------------------------
+    
+    @_sincronizado
+    def activar_diario(self, archivo='biblioteca.wal', tamano_grupo=256, intervalo=0.05):
+        """
+        Empieza a anexar cada mutación al diario de operaciones.
+        
+        Ver DiarioOperaciones para la política de sincronización por grupos.
+        """
+        if self._diario is not None:
+            self._diario.cerrar()
+        self._diario = DiarioOperaciones(archivo, tamano_grupo, intervalo)
+    
+    @_sincronizado
+    def cerrar_diario(self):
+        """Sincroniza y cierra el diario de operaciones."""
+        if self._diario is not None:
+            self._diario.cerrar()
+            self._diario = None
+    
+    def _anotar(self, operacion, *args):
+        """Anota una mutación en el diario, si está activo."""
+        if self._diario is not None:
+            self._secuencia_diario += 1
+            self._diario.registrar(self._secuencia_diario, operacion, args)
+    
+    @_sincronizado
+    def compactar(self, archivo_instantanea='biblioteca.snap'):
+        """
+        Guarda una instantánea del estado y vacía el diario.
+        
+        La instantánea se escribe a un archivo temporal y se renombra, y
+        guarda la secuencia de la última operación que incluye, de modo que
+        una caída entre ambos pasos no aplica dos veces ninguna operación.
+        El diario solo se vacía cuando la instantánea y el renombrado ya
+        están en disco.
+        """
+        if self._diario is None:
+            raise ValueError("El diario de operaciones no está activo.")
+        self._diario.sincronizar()
+        temporal = archivo_instantanea + '.tmp'
+        self.guardar_estado(temporal)
+        os.replace(temporal, archivo_instantanea)
+        _sincronizar_directorio(archivo_instantanea)
+        self._diario.truncar()
+    
+    @classmethod
+    def recuperar(cls, archivo_instantanea='biblioteca.snap', archivo_diario='biblioteca.wal', **opciones):
+        """
+        Reconstruye el sistema tras un reinicio: carga la instantánea (si
+        existe), reaplica el diario y lo deja activo para seguir anotando.
+        
+        Las operaciones del diario se aplican directamente, sin repetir las
+        validaciones de la API pública.
+        """
+        if os.path.exists(archivo_instantanea):
+            sistema = cls.cargar_estado(archivo_instantanea,
+                                        **{k: v for k, v in opciones.items()
+                                           if k in ('concurrente', 'dias_reserva', 'tamano_cache')})
+        else:
+            sistema = cls(**opciones)
+        
+        for secuencia, operacion, args in DiarioOperaciones.leer(archivo_diario):
+            if secuencia <= sistema._secuencia_diario:
+                continue
+            sistema._aplicar_operacion(operacion, args)
+            sistema._secuencia_diario = secuencia
+        
+        sistema.activar_diario(archivo_diario)
+        return sistema
+    
+    def _aplicar_operacion(self, operacion, args):
+        """Reaplica una operación leída del diario."""
+        if operacion == 'libro':
+            self._insertar_libro(*args, diferir_texto=True)
+        elif operacion == 'copias':
+            isbn, cantidad_cambio, *fecha = args
+            self._registrar_cambio_copias(isbn, cantidad_cambio, date.fromordinal(fecha[0]) if fecha else None)
+        elif operacion == 'usuario':
+            self._registrar_usuario(*args)
+        elif operacion == 'prestamo':
+            id_prestamo, isbn, id_usuario, fecha_prestamo, fecha_vencimiento, siguiente_id = args
+            self._registrar_prestamo(id_prestamo, isbn, id_usuario, date.fromordinal(fecha_prestamo),
+                                     date.fromordinal(fecha_vencimiento))
+            self._next_prestamo_id = max(self._next_prestamo_id, siguiente_id)
+        elif operacion == 'devolucion':
+            id_prestamo, fecha_devolucion = args
+            self._registrar_devolucion(id_prestamo, date.fromordinal(fecha_devolucion))
+        elif operacion == 'renovacion':
+            id_prestamo, fecha_vencimiento = args
+            self._registrar_renovacion(id_prestamo, date.fromordinal(fecha_vencimiento))
+        elif operacion == 'pago':
+            self._registrar_pago(*args)
+        elif operacion == 'reserva':
+            id_reserva, isbn, id_usuario, fecha_reserva, siguiente_id = args
+            self._registrar_reserva(id_reserva, isbn, id_usuario, date.fromordinal(fecha_reserva))
+            self._next_reserva_id = max(self._next_reserva_id, siguiente_id)
+        elif operacion == 'fin_reserva':
+            id_reserva, estado, fecha = args
+            self._cerrar_reserva(id_reserva, estado, date.fromordinal(fecha))
+        else:
+            raise ValueError(f"Operación desconocida en el diario: {operacion}")
 
 
 # ===========================================================================
@@ -643,19 +2672,13 @@ if __name__ == "__main__":
         print(f"✓ Préstamo {id_p1} (U1001 - LOTR) realizado.")
         
         
-        biblioteca.prestamos["P00002"] = { 
-            'isbn': "9788498387081",
-            'id_usuario': "U1002",
-            'fecha_prestamo': (datetime.now() - timedelta(days=10)).strftime("%Y-%m-%d"),
-            'fecha_vencimiento': (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d"), 
-            'fecha_devolucion': None,
-            'multa': 0.0,
-            'pagada': False
-        }
-        biblioteca.usuarios["U1002"]['prestamos_activos'].add("P00002")
-        biblioteca.usuarios["U1002"]['historial'].append("P00002")
-        biblioteca.catalogo["9788498387081"]['copias_disponibles'] -= 1
-        biblioteca._next_prestamo_id = 3
+        biblioteca._registrar_prestamo(
+            biblioteca._get_next_prestamo_id(),
+            "9788498387081",
+            "U1002",
+            date.today() - timedelta(days=10),
+            date.today() - timedelta(days=3)
+        )
         print("✓ Préstamo P00002 simulado como vencido (3 días de retraso).")
         
         
@@ -173,13 +173,546 @@ def prueba_reporte_financiero():
     print(" TEST: Reporte Financiero")
     print("="*60)
     
-    biblioteca = SistemaBiblioteca(multa_por_dia=2.0)
+    import os
+    import random
+    import tempfile
+    from datetime import date, timedelta
+    
+    # 0.1 por día no es exacto en binario: las sumas por rango deben
+    # coincidir igual con el recorrido préstamo por préstamo.
+    biblioteca = SistemaBiblioteca(multa_por_dia=0.1, limite_prestamos=10**6)
+    assert biblioteca.reporte_financiero() == {
+        'total_multas': 0.0, 'multas_pagadas': 0.0, 'multas_pendientes': 0.0,
+        'prestamos_con_multa': 0, 'promedio_multa': 0.0
+    }
+    
+    # Con esta semilla, sumar multas float en el árbol daba centavos de diferencia en algunos rangos
+    azar = random.Random(3)
+    isbns = [f"978000000{i:04d}" for i in range(50)]
+    for isbn in isbns:
+        biblioteca.agregar_libro(isbn, "Libro", "Autor", 2000, "General", 1)
+    for u in range(30):
+        biblioteca.registrar_usuario(f"U{u}", "Nombre", "a@b.c")
+    
+    # Historial en el pasado: la mayoría devueltos, con atraso de 0 a 40 días
+    # y la mitad de las multas pagadas; el resto sigue activo (algunos vencidos).
+    hoy = date.today()
+    for _ in range(3000):
+        isbn = azar.choice(isbns)
+        fecha_prestamo = hoy - timedelta(days=azar.randint(0, 400))
+        id_prestamo = biblioteca._get_next_prestamo_id()
+        biblioteca.catalogo[isbn]['copias_disponibles'] += 1
+        biblioteca._registrar_prestamo(id_prestamo, isbn, f"U{azar.randrange(30)}", fecha_prestamo,
+                                       fecha_prestamo + timedelta(days=14))
+        if azar.random() < 0.9:
+            biblioteca._registrar_devolucion(id_prestamo, fecha_prestamo + timedelta(days=azar.randint(0, 54)))
+            if biblioteca.prestamos[id_prestamo]['multa'] > 0 and azar.random() < 0.5:
+                biblioteca.pagar_multa(id_prestamo)
+    
+    def por_recorrido(sistema, inicio, fin):
+        """reporte_financiero recorriendo sistema.prestamos, en centavos exactos."""
+        total = pagadas = pendientes = con_multa = contadas = 0
+        for prestamo in sistema.prestamos.values():
+            devolucion = prestamo['fecha_devolucion']
+            if devolucion is None:
+                if fin is not None and fin < hoy:
+                    continue
+                centavos = round(max(0, (hoy - prestamo['fecha_vencimiento']).days) * 0.1 * 100)
+                if centavos <= 0:
+                    continue
+                pendientes += centavos
+            else:
+                if (inicio is not None and devolucion < inicio) or (fin is not None and devolucion > fin):
+                    continue
+                centavos = round(prestamo['multa'] * 100)
+                if prestamo['pagada']:
+                    pagadas += centavos
+                else:
+                    pendientes += centavos
+            total += centavos
+            contadas += 1
+            con_multa += centavos > 0
+        return {
+            'total_multas': round(total / 100, 2),
+            'multas_pagadas': round(pagadas / 100, 2),
+            'multas_pendientes': round(pendientes / 100, 2),
+            'prestamos_con_multa': con_multa,
+            'promedio_multa': round(total / 100 / contadas, 2) if contadas else 0.0
+        }
+    
+    rangos = [(None, None), (hoy, None), (None, hoy - timedelta(days=200))]
+    for _ in range(300):
+        a, b = sorted(hoy - timedelta(days=azar.randint(-10, 450)) for _ in range(2))
+        rangos.append((a, b))
+    
+    def comparar(sistema):
+        for inicio, fin in rangos:
+            esperado = por_recorrido(sistema, inicio, fin)
+            obtenido = sistema.reporte_financiero(inicio and inicio.isoformat(), fin and fin.isoformat())
+            assert obtenido == esperado, (inicio, fin, obtenido, esperado)
+            assert str(obtenido['multas_pendientes']) != '-0.0'
+    
+    comparar(biblioteca)
+    
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, 'biblioteca.snap')
+        biblioteca.guardar_estado(archivo)
+        cargada = SistemaBiblioteca.cargar_estado(archivo)
+    comparar(cargada)
+    
+    # Pagar tras cargar mueve el monto de pendientes a pagadas
+    pendiente = next(i for i, p in cargada.prestamos.items()
+                     if p['fecha_devolucion'] and p['multa'] > 0 and not p['pagada'])
+    cargada.pagar_multa(pendiente)
+    comparar(cargada)
     
-    # TODO: Implementar pruebas
-    # Casos a probar:
-    # - Reporte sin multas
-    # - Reporte con multas
-    # - Reporte con rango de fechas
+    print("✓ Prueba completada")
+
+
+def prueba_reservas():
+    """Prueba la cola de reservas: asignación, bloqueo, vencimiento y cancelación."""
+    from datetime import date, timedelta
+    
+    print("\n" + "="*60)
+    print(" TEST: Reservas")
+    print("="*60)
+    
+    biblioteca = SistemaBiblioteca(dias_reserva=3)
+    isbn = "9780000000001"
+    biblioteca.agregar_libro(isbn, "Libro", "Autor", 2000, "General", 1)
+    for id_usuario in ("U1", "U2", "U3"):
+        biblioteca.registrar_usuario(id_usuario, "Nombre", "a@b.c")
+    
+    # Con copias disponibles no se reserva
+    try:
+        biblioteca.reservar_libro(isbn, "U2")
+        assert False, "Debería rechazar la reserva de un libro disponible"
+    except ValueError:
+        pass
+    
+    prestamo = biblioteca.prestar_libro(isbn, "U1")
+    r1 = biblioteca.reservar_libro(isbn, "U2")
+    r2 = biblioteca.reservar_libro(isbn, "U3")
+    try:
+        biblioteca.reservar_libro(isbn, "U2")
+        assert False, "Debería rechazar una reserva duplicada"
+    except ValueError:
+        pass
+    
+    # La devolución aparta la copia para la primera reserva y la avisa
+    biblioteca.devolver_libro(prestamo)
+    assert biblioteca.reservas[r1]['estado'] == 'asignada'
+    assert biblioteca.reservas[r2]['estado'] == 'en_espera'
+    assert biblioteca.catalogo[isbn]['copias_disponibles'] == 0
+    assert [e['tipo'] for e in biblioteca.notificaciones("U2")] == ['reserva_asignada']
+    assert biblioteca.notificaciones("U2") == []
+    
+    # La copia apartada no la puede llevar otro usuario
+    for id_usuario in ("U1", "U3"):
+        try:
+            biblioteca.prestar_libro(isbn, id_usuario)
+            assert False, "La copia apartada no debería prestarse a otro usuario"
+        except LibroNoDisponible:
+            pass
+    
+    # Si vence el plazo, la copia pasa a la siguiente reserva
+    vencidas = biblioteca.vencer_reservas(date.today() + timedelta(days=4))
+    assert vencidas == [r1]
+    assert biblioteca.reservas[r1]['estado'] == 'vencida'
+    assert biblioteca.reservas[r2]['estado'] == 'asignada'
+    assert [e['tipo'] for e in biblioteca.notificaciones("U2")] == ['reserva_vencida']
+    assert [e['tipo'] for e in biblioteca.notificaciones("U3")] == ['reserva_asignada']
+    
+    # El titular de la reserva retira la copia
+    prestamo = biblioteca.prestar_libro(isbn, "U3")
+    assert biblioteca.reservas[r2]['estado'] == 'cumplida'
+    
+    # Una reserva cancelada en espera se salta; una asignada libera su copia
+    r3 = biblioteca.reservar_libro(isbn, "U1")
+    r4 = biblioteca.reservar_libro(isbn, "U2")
+    biblioteca.cancelar_reserva(r3)
+    assert biblioteca.reservas[r3]['estado'] == 'cancelada'
+    biblioteca.devolver_libro(prestamo)
+    assert biblioteca.reservas[r4]['estado'] == 'asignada'
+    biblioteca.cancelar_reserva(r4)
+    assert biblioteca.reservas[r4]['estado'] == 'cancelada'
+    assert biblioteca.catalogo[isbn]['copias_disponibles'] == 1
+    try:
+        biblioteca.cancelar_reserva(r4)
+        assert False, "No se debería cancelar dos veces"
+    except ValueError:
+        pass
+    assert biblioteca.notificaciones("U2") == []
+    
+    print("✓ Prueba completada")
+
+
+def prueba_cache_reportes():
+    """Prueba que los reportes en caché reflejan cada mutación al instante."""
+    from datetime import date, timedelta
+    
+    print("\n" + "="*60)
+    print(" TEST: Caché de reportes")
+    print("="*60)
+    
+    # Las mismas operaciones sobre un sistema con caché y otro sin ella
+    con_cache = SistemaBiblioteca(dias_reserva=3)
+    sin_cache = SistemaBiblioteca(dias_reserva=3, tamano_cache=0)
+    
+    def ambos(metodo, *args):
+        resultado = getattr(con_cache, metodo)(*args)
+        assert getattr(sin_cache, metodo)(*args) == resultado
+        return resultado
+    
+    def reportes(sistema):
+        return (sistema.libros_mas_prestados(10), sistema.usuarios_mas_activos(10),
+                sistema.estadisticas_categoria("Ficción"))
+    
+    anteriores = [reportes(con_cache)]
+    
+    def verificar(paso, cambia=True):
+        actuales = reportes(con_cache)
+        assert actuales == reportes(sin_cache), f"Caché desactualizada tras: {paso}"
+        if cambia:
+            assert actuales != anteriores[0], f"El paso no cambió los reportes: {paso}"
+        anteriores[0] = actuales
+    
+    ambos('agregar_libro', "9780000000001", "Libro A", "Autor", 2000, "Ficción", 1)
+    verificar("agregar_libro")
+    ambos('registrar_usuario', "U1", "Ana", "ana@b.c")
+    verificar("registrar_usuario")
+    ambos('registrar_usuario', "U2", "Luis", "luis@b.c")
+    verificar("registrar_usuario")
+    
+    prestamo = ambos('prestar_libro', "9780000000001", "U1")
+    verificar("préstamo")
+    ambos('devolver_libro', prestamo)
+    verificar("devolución")
+    ambos('actualizar_copias', "9780000000001", 1)
+    verificar("actualizar_copias")
+    
+    # Una devolución con reserva en espera aparta la copia: sigue contando como prestada
+    ambos('agregar_libro', "9780000000002", "Libro B", "Autor", 2001, "Ficción", 1)
+    verificar("agregar_libro")
+    prestamo = ambos('prestar_libro', "9780000000002", "U1")
+    verificar("préstamo")
+    reserva = ambos('reservar_libro', "9780000000002", "U2")
+    ambos('devolver_libro', prestamo)
+    verificar("asignación de reserva al devolver", cambia=False)
+    assert anteriores[0][2]['copias_prestadas'] == 1
+    
+    # Cancelar la reserva asignada libera la copia
+    ambos('cancelar_reserva', reserva)
+    verificar("cancelación de reserva asignada")
+    assert anteriores[0][2]['copias_prestadas'] == 0
+    
+    # Una reserva asignada que vence también libera la copia
+    prestamo = ambos('prestar_libro', "9780000000002", "U1")
+    ambos('reservar_libro', "9780000000002", "U2")
+    ambos('devolver_libro', prestamo)
+    verificar("asignación de reserva al devolver")
+    ambos('vencer_reservas', date.today() + timedelta(days=4))
+    verificar("vencimiento de reserva")
+    assert anteriores[0][2]['copias_prestadas'] == 0
+    
+    # Modificar lo retornado no altera la caché
+    libros, usuarios, estadisticas = reportes(con_cache)
+    libros.clear()
+    usuarios.append(("X", "Intruso", 99))
+    estadisticas['total_libros'] = -1
+    assert reportes(con_cache) == anteriores[0]
+    
+    print("✓ Prueba completada")
+
+
+def prueba_catalogo_mapeado():
+    """Prueba que CatalogoMapeado responde igual que SistemaBiblioteca."""
+    import os
+    import random
+    import tempfile
+    from Biblioteca_Mapeada import CatalogoMapeado, publicar_catalogo
+    
+    print("\n" + "="*60)
+    print(" TEST: Catálogo mapeado")
+    print("="*60)
+    
+    azar = random.Random(11)
+    palabras = ['amor', 'guerra', 'Ñandú', 'ÁRBOL', 'río', 'corazón', 'straße', '東京', 'café☕',
+                'noche', 'a|b', 'x,"y"', 'fin']
+    categorias = ['Ficción', 'Historia', 'Poesía', 'Ciencia']
+    biblioteca = SistemaBiblioteca()
+    isbns = []
+    for i in range(300):
+        isbn = f"978{azar.randrange(10**10):010d}"
+        if isbn in biblioteca.catalogo:
+            continue
+        titulo = ' '.join(azar.choice(palabras) for _ in range(azar.randint(1, 4)))
+        autor = f"{azar.choice(palabras)} {azar.choice(['García', 'Márquez', 'Ōe', 'Borges'])}"
+        biblioteca.agregar_libro(isbn, titulo, autor, 1990 + azar.randrange(30), azar.choice(categorias),
+                                 azar.randint(1, 3))
+        isbns.append(isbn)
+    biblioteca.agregar_libro("9789999999999", "Salto\nde línea", "Autor é", 2000, "ficción", 1)
+    isbns.append("9789999999999")
+    
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, 'catalogo.map')
+        publicar_catalogo(biblioteca, archivo)
+        with CatalogoMapeado(archivo) as mapeado:
+            # Acceso por ISBN, pertenencia y orden de iteración
+            assert len(mapeado) == len(biblioteca.catalogo)
+            assert list(mapeado) == list(biblioteca.catalogo)
+            for isbn in isbns:
+                assert isbn in mapeado and mapeado[isbn] == dict(biblioteca.catalogo[isbn])
+            for ausente in ("9780000000000", "978000000000x", "123", 9789999999999):
+                assert ausente not in mapeado
+            try:
+                mapeado["9780000000000"]
+                assert False, "Debería lanzar KeyError"
+            except KeyError:
+                pass
+            
+            # Búsquedas de texto: acentos, mayúsculas, multibyte y límites entre libros
+            consultas = ['', 'a', 'or', 'amor', 'ñandú', 'árbol', 'ÁRBOL', 'straße', '東', '京 c', '☕',
+                         'o\nd', 'fin', 'n f', 'a|b x', '"y', 'é', 'zzz',
+                         # El archivo separa los textos con '\0': no debe coincidir a través de él
+                         'fin\0', '\0amor', 'r\0'] + \
+                        [azar.choice(palabras).lower()[1:4] for _ in range(10)]
+            for consulta in consultas:
+                for campo in ('titulo', 'autor'):
+                    for categoria in (None, 'FICCIÓN', 'Poesía', 'nada'):
+                        esperado = biblioteca.buscar_libros(campo, consulta, categoria)
+                        assert mapeado.buscar_libros(campo, consulta, categoria) == esperado, \
+                            (campo, consulta, categoria)
+                        assert list(mapeado.iterar_libros(campo, consulta, categoria, 2, 5)) == \
+                            [dict(v) for v in biblioteca.iterar_libros(campo, consulta, categoria, 2, 5)]
+            
+            # Año (comparación textual) y categoría
+            for anio in ('2000', '1995', '01995', 'x', ''):
+                for categoria in (None, 'ciencia'):
+                    assert mapeado.buscar_libros('anio', anio, categoria) == \
+                        biblioteca.buscar_libros('anio', anio, categoria), (anio, categoria)
+            assert mapeado.buscar_libros('otro', 'x') == []
+    
+    print("✓ Prueba completada")
+
+
+def _carga_concurrente(biblioteca, ejecutar, clientes, operaciones, isbns, usuarios):
+    """
+    Lanza `clientes` hilos que consultan el estado de usuarios, prestan y
+    devuelven al azar; retorna los segundos. Relanza el primer error de un hilo.
+    """
+    import threading
+    import random
+    import time
+    
+    inicio = threading.Barrier(clientes + 1)
+    errores = []
+    
+    def cliente(semilla):
+        azar = random.Random(semilla)
+        mios = []
+        inicio.wait()
+        try:
+            for _ in range(operaciones):
+                sorteo = azar.random()
+                if sorteo < 0.2:
+                    ejecutar(biblioteca.obtener_estado_usuario, azar.choice(usuarios))
+                elif mios and sorteo < 0.6:
+                    ejecutar(biblioteca.devolver_libro, mios.pop(azar.randrange(len(mios))))
+                else:
+                    try:
+                        mios.append(ejecutar(biblioteca.prestar_libro, azar.choice(isbns), azar.choice(usuarios)))
+                    except (LibroNoDisponible, LimitePrestamosExcedido):
+                        pass
+        except Exception as e:
+            errores.append(e)
+    
+    hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    for hilo in hilos:
+        hilo.start()
+    inicio.wait()
+    t0 = time.perf_counter()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - t0
+    if errores:
+        raise errores[0]
+    return segundos
+
+
+def prueba_concurrencia():
+    """Prueba consultas de estado, préstamos y devoluciones desde 32 hilos."""
+    import threading
+    
+    print("\n" + "="*60)
+    print(" TEST: Concurrencia (32 clientes)")
+    print("="*60)
+    
+    clientes, operaciones = 32, 500
+    isbns = [f"978000000{i:04d}" for i in range(20)]
+    usuarios = [f"U{i}" for i in range(64)]
+    
+    def crear(**opciones):
+        biblioteca = SistemaBiblioteca(limite_prestamos=3, **opciones)
+        for isbn in isbns:
+            biblioteca.agregar_libro(isbn, "Libro", "Autor", 2000, "General", 2)
+        for id_usuario in usuarios:
+            biblioteca.registrar_usuario(id_usuario, "Nombre", "a@b.c")
+        return biblioteca
+    
+    # Cerrojos por libro y por usuario
+    biblioteca = crear(concurrente=True)
+    segundos = _carga_concurrente(biblioteca, lambda f, *a: f(*a), clientes, operaciones, isbns, usuarios)
+    
+    activos = [p for p in biblioteca.prestamos.values() if p['fecha_devolucion'] is None]
+    for isbn in isbns:
+        libro = biblioteca.catalogo[isbn]
+        prestados = sum(1 for p in activos if p['isbn'] == isbn)
+        assert libro['copias_disponibles'] >= 0, f"Copias vendidas de más en {isbn}"
+        assert libro['copias_disponibles'] + prestados == libro['copias_total']
+    for id_usuario in usuarios:
+        assert len(biblioteca.usuarios[id_usuario]['prestamos_activos']) <= 3
+    ids = [p for u in biblioteca.usuarios.values() for p in u['historial']]
+    assert len(ids) == len(set(ids)) == len(biblioteca.prestamos), "IDs de préstamo repetidos"
+    
+    # Referencia: un solo cerrojo global alrededor de cada llamada
+    cerrojo_global = threading.Lock()
+    
+    def con_cerrojo_global(f, *a):
+        with cerrojo_global:
+            return f(*a)
+    
+    segundos_global = _carga_concurrente(crear(), con_cerrojo_global, clientes, operaciones, isbns, usuarios)
+    
+    total = clientes * operaciones
+    print(f"Cerrojos finos:  {total / segundos:,.0f} op/s")
+    print(f"Cerrojo global:  {total / segundos_global:,.0f} op/s")
+    print("✓ Prueba completada")
+
+
+def prueba_instantanea():
+    """Prueba guardar_estado/cargar_estado con IDs de usuario de texto y enteros."""
+    import os
+    import tempfile
+    
+    print("\n" + "="*60)
+    print(" TEST: Instantánea binaria")
+    print("="*60)
+    
+    biblioteca = SistemaBiblioteca()
+    biblioteca.agregar_libro("9780000000001", "Libro A", "Autor", 2000, "General", 1)
+    biblioteca.agregar_libro("9780000000002", "Libro B", "Autora", 2001, "Ciencia", 2)
+    # El entero 1001 y el texto "1001" son usuarios distintos
+    ids = [1001, "1001", "U1", "\0raro"]
+    for id_usuario in ids:
+        biblioteca.registrar_usuario(id_usuario, "Nombre", "a@b.c")
+    p1 = biblioteca.prestar_libro("9780000000001", 1001)
+    p2 = biblioteca.prestar_libro("9780000000002", "1001")
+    biblioteca.prestar_libro("9780000000002", "\0raro")
+    biblioteca.devolver_libro(p2)
+    reserva = biblioteca.reservar_libro("9780000000001", "U1")
+    
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, 'biblioteca.snap')
+        biblioteca.guardar_estado(archivo)
+        for usar_mmap in (False, True):
+            cargada = SistemaBiblioteca.cargar_estado(archivo, usar_mmap=usar_mmap)
+            assert list(cargada.usuarios) == ids
+            assert [type(i) for i in cargada.usuarios] == [int, str, str, str]
+            assert cargada.prestamos[p1]['id_usuario'] == 1001
+            assert cargada.prestamos[p2]['id_usuario'] == "1001"
+            assert cargada.reservas[reserva]['id_usuario'] == "U1"
+            for id_usuario in ids:
+                assert cargada.obtener_estado_usuario(id_usuario) == biblioteca.obtener_estado_usuario(id_usuario)
+            assert cargada.catalogo == biblioteca.catalogo
+            assert cargada.libros_mas_prestados() == biblioteca.libros_mas_prestados()
+            # El sistema cargado sigue operando con el ID entero
+            cargada.devolver_libro(p1)
+            assert cargada.obtener_estado_usuario(1001)['prestamos_activos'] == 0
+        
+        # Una instantánea cortada da ValueError también con mmap
+        with open(archivo, 'rb') as f:
+            datos = f.read()
+        with open(archivo, 'wb') as f:
+            f.write(datos[:-60])
+        for usar_mmap in (False, True):
+            try:
+                SistemaBiblioteca.cargar_estado(archivo, usar_mmap=usar_mmap)
+                assert False, "Debería rechazar una instantánea incompleta"
+            except ValueError:
+                pass
+    
+    print("✓ Prueba completada")
+
+
+def prueba_recuperacion():
+    """Prueba recuperar: instantánea, reaplicación del diario y cola cortada."""
+    import os
+    import tempfile
+    
+    print("\n" + "="*60)
+    print(" TEST: Recuperación desde diario")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as carpeta:
+        instantanea = os.path.join(carpeta, 'biblioteca.snap')
+        diario = os.path.join(carpeta, 'biblioteca.wal')
+        
+        biblioteca = SistemaBiblioteca.recuperar(instantanea, diario)
+        biblioteca.agregar_libro("9780000000001", "Libro A", "Autor", 2000, "General", 2)
+        biblioteca.agregar_libro("9780000000002", "Libro B", "Autor", 2001, "General", 1)
+        biblioteca.registrar_usuario("U1", "Ana", "ana@b.c")
+        primero = biblioteca.prestar_libro("9780000000001", "U1")
+        biblioteca.compactar(instantanea)
+        assert os.path.getsize(diario) == 0, "El diario no se vació al compactar"
+        
+        # Operaciones posteriores a la instantánea: solo están en el diario
+        biblioteca.devolver_libro(primero)
+        segundo = biblioteca.prestar_libro("9780000000002", "U1")
+        biblioteca.cerrar_diario()
+        tamano_valido = os.path.getsize(diario)
+        
+        # Caída a mitad de una escritura: la última línea queda incompleta
+        with open(diario, 'a', encoding='utf-8') as f:
+            f.write('[99,"prestamo",["P0')
+        
+        recuperada = SistemaBiblioteca.recuperar(instantanea, diario)
+        assert os.path.getsize(diario) == tamano_valido, "La cola cortada no se descartó"
+        assert recuperada.prestamos[primero]['fecha_devolucion'] is not None
+        assert recuperada.prestamos[segundo]['fecha_devolucion'] is None
+        assert recuperada.catalogo["9780000000001"]['copias_disponibles'] == 2
+        assert recuperada.catalogo["9780000000002"]['copias_disponibles'] == 0
+        assert recuperada.obtener_estado_usuario("U1")['prestamos_activos'] == 1
+        
+        # El diario recuperado sigue anotando a continuación
+        recuperada.devolver_libro(segundo)
+        recuperada.cerrar_diario()
+        otra = SistemaBiblioteca.recuperar(instantanea, diario)
+        assert otra.catalogo["9780000000002"]['copias_disponibles'] == 1
+        assert otra.prestar_libro("9780000000001", "U1") not in (primero, segundo)
+        otra.cerrar_diario()
+        
+        # Una línea corrupta en medio del diario no es una escritura
+        # interrumpida: se rechaza sin recortar las operaciones siguientes
+        diario_medio = os.path.join(carpeta, 'medio.wal')
+        biblioteca = SistemaBiblioteca.recuperar(os.path.join(carpeta, 'medio.snap'), diario_medio)
+        for i in range(1, 5):
+            biblioteca.agregar_libro(f"978000000000{i}", f"Libro {i}", "Autor", 2000, "General", 1)
+        biblioteca.registrar_usuario("U1", "Ana", "ana@b.c")
+        biblioteca.cerrar_diario()
+        with open(diario_medio, 'rb') as f:
+            lineas = f.readlines()
+        assert len(lineas) == 5
+        lineas[1] = b'{corrupta\n'
+        with open(diario_medio, 'wb') as f:
+            f.writelines(lineas)
+        try:
+            SistemaBiblioteca.recuperar(os.path.join(carpeta, 'medio.snap'), diario_medio)
+            assert False, "Debería rechazar un diario corrupto en medio"
+        except ValueError:
+            pass
+        with open(diario_medio, 'rb') as f:
+            assert f.readlines() == lineas, "El diario corrupto no debe modificarse"
     
     print("✓ Prueba completada")
 
@@ -204,7 +737,13 @@ def ejecutar_todas_las_pruebas():
         prueba_excepciones,
         prueba_importar_exportar,
         prueba_renovar_prestamo,
-        prueba_reporte_financiero
+        prueba_reporte_financiero,
+        prueba_reservas,
+        prueba_cache_reportes,
+        prueba_catalogo_mapeado,
+        prueba_concurrencia,
+        prueba_instantanea,
+        prueba_recuperacion
     ]
     
     exitosas = 0